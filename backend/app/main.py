@@ -1,9 +1,10 @@
 <CODE_BLOCK>
 ```python
 import os
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+from fastapi import FastAPI, Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Set
 from jose import jwt, JWTError
 import requests
 
@@ -52,28 +53,90 @@ def verify_token(token: str = Depends(bearer_scheme)) -> Dict[str, Any]:
 # --- Placeholder Clients for Other Services ---
 # Replace with actual client implementations for each service
 class OpenMetadataClient:
-    def list_datasets(self, user: Dict[str, Any]) -> List[Dict[str, Any]]:
-        print(f"OpenMetadataClient: Listing datasets for user {user['username']}")
-        # Simulate fetching data
-        return [
+    async def list_datasets(self, user: Dict[str, Any], limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        print(f"OpenMetadataClient: Listing datasets for user {user['username']} limit={limit} offset={offset}")
+        # Simulate fetching one page of data
+        datasets = [
             {"id": "dataset1", "name": "sales_data", "description": "Sales data"},
             {"id": "dataset2", "name": "customer_churn", "description": "Customer churn data"},
         ]
+        return datasets[offset:offset + limit]
 
 class PrefectClient:
-    def get_pipelines_for_dataset(self, dataset_id: str, user: Dict[str, Any]) -> List[Dict[str, Any]]:
-        print(f"PrefectClient: Getting pipelines for dataset {dataset_id} for user {user['username']}")
+    async def get_pipelines_for_datasets(self, dataset_ids: List[str], user: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Fetches pipelines for many datasets in one round trip.
+        Against the Prefect API this is a single POST /deployments/filter with
+        {"deployments": {"tags": {"any_": ["dataset:<id>", ...]}}}, grouped by tag.
+        """
+        print(f"PrefectClient: Getting pipelines for datasets {dataset_ids} for user {user['username']}")
         # Simulate fetching data
-        if dataset_id == "dataset1":
-            return [
+        pipelines = {
+            "dataset1": [
                 {"id": "pipeline1", "name": "daily_sales_sync", "status": "running"},
                 {"id": "pipeline2", "name": "weekly_sales_report", "status": "completed"},
-            ]
-        return []
+            ],
+        }
+        return {dataset_id: pipelines.get(dataset_id, []) for dataset_id in dataset_ids}
+
+    async def get_pipelines_for_dataset(self, dataset_id: str, user: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return (await self.get_pipelines_for_datasets([dataset_id], user=user))[dataset_id]
 
 openmetadata_client = OpenMetadataClient()
 prefect_client = PrefectClient()
 
+PIPELINE_BATCH_SIZE = int(os.getenv("PIPELINE_BATCH_SIZE", "100"))
+PIPELINE_MAX_CONCURRENCY = int(os.getenv("PIPELINE_MAX_CONCURRENCY", "4"))
+
+class PipelineLoader:
+    """
+    Dataloader for Prefect pipelines, created once per request.
+    load() calls made in the same event-loop tick are coalesced into batched
+    filter queries (at most PIPELINE_BATCH_SIZE ids each, PIPELINE_MAX_CONCURRENCY
+    in flight), and results are memoized for the lifetime of the request.
+    """
+    def __init__(self, client: PrefectClient, user: Dict[str, Any]):
+        self.client = client
+        self.user = user
+        self._cache: Dict[str, asyncio.Future] = {}
+        self._queue: List[str] = []
+        self._semaphore = asyncio.Semaphore(PIPELINE_MAX_CONCURRENCY)
+        # The loop only holds weak references to tasks; keep in-flight fetches alive
+        self._tasks: Set[asyncio.Task] = set()
+
+    def load(self, dataset_id: str) -> asyncio.Future:
+        if dataset_id not in self._cache:
+            loop = asyncio.get_running_loop()
+            self._cache[dataset_id] = loop.create_future()
+            if not self._queue:
+                loop.call_soon(self._dispatch)
+            self._queue.append(dataset_id)
+        return self._cache[dataset_id]
+
+    async def load_many(self, dataset_ids: List[str]) -> List[List[Dict[str, Any]]]:
+        return list(await asyncio.gather(*(self.load(i) for i in dataset_ids)))
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), PIPELINE_BATCH_SIZE):
+            task = asyncio.ensure_future(self._fetch(keys[start:start + PIPELINE_BATCH_SIZE]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, keys: List[str]) -> None:
+        try:
+            async with self._semaphore:
+                results = await self.client.get_pipelines_for_datasets(keys, user=self.user)
+        except Exception as e:
+            for key in keys:
+                self._cache.pop(key).set_exception(e)
+            return
+        for key in keys:
+            self._cache[key].set_result(results.get(key, []))
+
+def get_pipeline_loader(user: Dict[str, Any] = Depends(verify_token)) -> PipelineLoader:
+    return PipelineLoader(prefect_client, user)
+
 # --- Root Endpoint ---
 @app.get("/")
 async def read_root():
@@ -83,14 +146,21 @@ async def read_root():
 
 # Example endpoint demonstrating integration with OpenMetadata and Prefect
 @app.get("/api/datasets", dependencies=[Depends(verify_token)])
-async def get_datasets(user: Dict[str, Any] = Depends(verify_token)):
+async def get_datasets(
+    user: Dict[str, Any] = Depends(verify_token),
+    pipelines: PipelineLoader = Depends(get_pipeline_loader),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
     """
-    Fetches datasets from OpenMetadata and enriches them with related pipelines from Prefect.
+    Fetches one page of datasets from OpenMetadata and enriches them with related pipelines from Prefect.
+    Pipelines for the whole page are fetched with batched queries instead of one call per dataset.
     """
-    datasets = openmetadata_client.list_datasets(user=user)
-    for ds in datasets:
-        ds["pipelines"] = prefect_client.get_pipelines_for_dataset(ds["id"], user=user)
-    return datasets
+    datasets = await openmetadata_client.list_datasets(user=user, limit=limit, offset=offset)
+    for ds, ds_pipelines in zip(datasets, await pipelines.load_many([ds["id"] for ds in datasets])):
+        ds["pipelines"] = ds_pipelines
+    next_offset = offset + limit if len(datasets) == limit else None
+    return {"data": datasets, "paging": {"limit": limit, "offset": offset, "next_offset": next_offset}}
 
 @app.get("/api/pipelines", dependencies=[Depends(verify_token)])
 async def get_pipelines(user: Dict[str, Any] = Depends(verify_token)):
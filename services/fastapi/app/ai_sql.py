@@ -1,39 +1,113 @@
 import os
 import duckdb
-from fastapi import APIRouter, HTTPException
+from contextlib import contextmanager
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel
 import pathlib
 
+from .ratelimit import rate_limit
+from .responses import ORJSONResponse
+from .shared_cache import shared_cache
+from .rollups import base_supports, choose_rollup, compile_query, load_catalog, parse_question
+from .snapshots import NoSnapshot, SnapshotReader
+from .tracing import tracer
+
 PRODUCTS_METRICS_CSV = os.getenv("PRODUCTS_METRICS_CSV", "/app/samples/products_metrics.csv")
+PRODUCTS_CSV = os.getenv("PRODUCTS_CSV", "/app/samples/products.csv")
 
 router = APIRouter()
 
 DUCKDB_PATH = os.getenv("DUCKDB_PATH", ":memory:")
+# When set, queries run read-only against the snapshots published by the Prefect flows
+DUCKDB_SNAPSHOT_DIR = os.getenv("DUCKDB_SNAPSHOT_DIR", "")
+
+snapshot_reader = SnapshotReader(DUCKDB_SNAPSHOT_DIR) if DUCKDB_SNAPSHOT_DIR else None
+# Rendered results keyed on snapshot version + SQL; published snapshots never change,
+# so the TTL only bounds memory. Used in snapshot mode only.
+AI_SQL_CACHE_TTL = float(os.getenv("AI_SQL_CACHE_TTL", "3600"))
+result_cache = shared_cache("ai_sql")
 
 
 class QueryRequest(BaseModel):
     q: str
 
 
-@router.post("/ai-sql")
+@contextmanager
+def _connection():
+    """Yields (connection, snapshot version); the version is None outside snapshot mode."""
+    if snapshot_reader is not None:
+        with snapshot_reader.versioned_cursor() as (cur, version):
+            yield cur, version
+        return
+    with tracer.start_as_current_span("duckdb.connect", attributes={"duckdb.path": DUCKDB_PATH}):
+        con = duckdb.connect(DUCKDB_PATH)
+    try:
+        yield con, None
+    finally:
+        con.close()
+
+
+def _ensure_table(con, table: str, csv_path: str, label: str):
+    """Lazily load a sample CSV into DuckDB if the table is not there already.
+    Snapshots are read-only, so there it goes into a per-cursor temp table."""
+    tables = [t[0] for t in con.execute("show tables").fetchall()]
+    if table in tables:
+        return
+    if not pathlib.Path(csv_path).exists():
+        raise HTTPException(status_code=500, detail=f"{label} CSV missing")
+    temp = "TEMP " if snapshot_reader is not None else ""
+    with tracer.start_as_current_span("duckdb.load", attributes={"duckdb.source": csv_path}):
+        con.execute(f"CREATE {temp}TABLE {table} AS SELECT * FROM read_csv_auto('{csv_path}')")
+
+
+@router.post("/ai-sql", dependencies=[Depends(rate_limit("ai_sql"))])
 def ai_sql(req: QueryRequest):
     question = req.q.lower()
-    if "top" in question and "roi" in question:
-        sql = (
-            "SELECT product_id, roi FROM products ORDER BY roi DESC LIMIT 5"
-        )
-    else:
+    spec = parse_question(question)
+    if spec is None and not ("top" in question and "roi" in question):
         raise HTTPException(status_code=400, detail="Unsupported query in demo")
 
-    con = duckdb.connect(DUCKDB_PATH)
+    rollup = cache_key = None
     try:
-        # Lazily load metrics CSV into DuckDB if not already.
-        tables = [t[0] for t in con.execute("show tables").fetchall()]
-        if "products" not in tables:
-            if not pathlib.Path(PRODUCTS_METRICS_CSV).exists():
-                raise HTTPException(status_code=500, detail="Products metrics CSV missing")
-            con.execute(f"CREATE TABLE products AS SELECT * FROM read_csv_auto('{PRODUCTS_METRICS_CSV}')")
-        results = con.execute(sql).fetchall()
+        with _connection() as (con, version):
+            if spec is None:
+                sql = (
+                    "SELECT product_id, roi FROM products ORDER BY roi DESC LIMIT 5"
+                )
+                sources = [("products", PRODUCTS_METRICS_CSV, "Products metrics")]
+            else:
+                # Grouped questions are answered from a rollup when one covers them
+                rollup = choose_rollup(spec, load_catalog(con))
+                sql = compile_query(spec, rollup)
+                sources = [] if rollup else [
+                    ("products", PRODUCTS_METRICS_CSV, "Products metrics"),
+                    ("product_categories", PRODUCTS_CSV, "Products"),
+                ]
+            if version is not None:
+                cache_key = f"{version}:{sql}"
+                cached = result_cache.get(cache_key)
+                if cached is not None:
+                    headers = {"X-Cache": "hit"}
+                    return Response(cached, media_type="application/json", headers=headers)
+            for table, csv_path, label in sources:
+                _ensure_table(con, table, csv_path, label)
+            if spec is not None and rollup is None and not base_supports(spec, con):
+                raise HTTPException(
+                    status_code=400, detail="Daily questions need products with loaded_at"
+                )
+            exec_attrs = {"db.statement": sql, "ai_sql.rollup": rollup or ""}
+            with tracer.start_as_current_span("duckdb.execute", attributes=exec_attrs) as span:
+                results = con.execute(sql).fetchall()
+                span.set_attribute("db.rows", len(results))
+    except HTTPException:
+        raise
+    except NoSnapshot as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DuckDB error: {e}")
-    return {"sql": sql, "results": results}
+    # Returned directly so DuckDB rows skip jsonable_encoder and go straight to orjson
+    response = ORJSONResponse({"sql": sql, "results": results, "rollup": rollup})
+    if cache_key is not None:
+        result_cache.set(cache_key, response.body, AI_SQL_CACHE_TTL)
+        response.headers["X-Cache"] = "miss"
+    return response
@@ -0,0 +1,72 @@
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import json
+import os
+import jwt
+from jwt import PyJWKClient, PyJWKSet
+
+from .shared_cache import shared_cache
+from .tracing import tracer
+
+# Simple OIDC validation (Keycloak) - minimal
+OIDC_ISSUER = os.getenv("OIDC_ISSUER", "http://keycloak:8080/realms/master")
+OIDC_PUBLIC_ISSUER = os.getenv("OIDC_PUBLIC_ISSUER", OIDC_ISSUER)
+OIDC_AUDIENCE = os.getenv("OIDC_AUDIENCE", "account")
+JWK_URL = f"{OIDC_ISSUER}/protocol/openid-connect/certs"
+JWKS_CACHE_TTL = float(os.getenv("JWKS_CACHE_TTL", "300"))
+jwks_cache = shared_cache("jwks")
+
+
+class SharedJWKClient(PyJWKClient):
+    """PyJWKClient whose key set is fetched once for all workers via the shared cache.
+    A forced refresh (unknown ``kid``, i.e. key rotation) bypasses and replaces the shared copy."""
+
+    def get_jwk_set(self, refresh: bool = False) -> PyJWKSet:
+        local_hit = self.jwk_set_cache is not None and self.jwk_set_cache.get() is not None
+        if not refresh and not local_hit:
+            shared = jwks_cache.get(self.uri)
+            if shared is not None:
+                data = json.loads(shared)
+                if self.jwk_set_cache is not None:
+                    self.jwk_set_cache.put(data)
+                return PyJWKSet.from_dict(data)
+        return super().get_jwk_set(refresh)
+
+    def fetch_data(self):
+        data = super().fetch_data()
+        jwks_cache.set(self.uri, json.dumps(data).encode(), JWKS_CACHE_TTL)
+        return data
+
+
+jwk_client = SharedJWKClient(JWK_URL, lifespan=JWKS_CACHE_TTL)
+http_bearer = HTTPBearer(auto_error=False)
+
+
+def verify_token(creds: HTTPAuthorizationCredentials = Depends(http_bearer)):
+    if creds is None:
+        raise HTTPException(status_code=401, detail="Missing bearer token")
+    token = creds.credentials
+    with tracer.start_as_current_span("jwt.verify"):
+        try:
+            with tracer.start_as_current_span("jwt.signing_key"):
+                signing_key = jwk_client.get_signing_key_from_jwt(token).key
+            # Permissive on audience for local dev: Keycloak tokens often carry other audiences
+            payload = jwt.decode(
+                token,
+                signing_key,
+                algorithms=["RS256"],
+                options={"verify_exp": True, "verify_aud": False},
+            )
+            return payload
+        except Exception as e:
+            raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+
+
+PROFILER_ROLE = os.getenv("PROFILER_ROLE", "admin")
+
+
+def require_admin(user=Depends(verify_token)):
+    roles = (user.get("realm_access") or {}).get("roles", [])
+    if PROFILER_ROLE not in roles:
+        raise HTTPException(status_code=403, detail=f"Role '{PROFILER_ROLE}' required")
+    return user
@@ -1,7 +1,14 @@
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import (
+    Counter, Histogram, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+)
+from prometheus_client import multiprocess
 from fastapi import APIRouter, Request, Response, FastAPI
+import os
 import time
 
+# Set (before prometheus_client is imported) when running several workers, see gunicorn_conf.py
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
 REQUEST_COUNT = Counter("fastapi_requests_total", "Total HTTP requests", ["method", "path", "status"])
 REQUEST_LATENCY = Histogram("fastapi_request_latency_seconds", "Request latency", ["method", "path"])
 
@@ -20,6 +27,11 @@ async def metrics_middleware(request: Request, call_next):
 
 @router.get("/metrics")
 def metrics():
+    if PROMETHEUS_MULTIPROC_DIR:
+        # Aggregate the per-process files written by every worker, not just this one
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=PROMETHEUS_MULTIPROC_DIR)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 def init_instrumentation(app: FastAPI):
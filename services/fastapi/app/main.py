@@ -1,38 +1,15 @@
 from fastapi import FastAPI, HTTPException, Depends, Request, Response
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 import httpx
 from urllib.parse import urlencode
 import base64, hashlib, secrets
 from .ai_sql import router as ai_sql_router  # registers AI SQL endpoints
+from .auth import OIDC_ISSUER, OIDC_PUBLIC_ISSUER, require_admin, verify_token
 from .instrumentation import init_instrumentation
-import jwt
-from jwt import PyJWKClient
-
-# Simple OIDC validation (Keycloak) - minimal
-OIDC_ISSUER = os.getenv("OIDC_ISSUER", "http://keycloak:8080/realms/master")
-OIDC_PUBLIC_ISSUER = os.getenv("OIDC_PUBLIC_ISSUER", OIDC_ISSUER)
-OIDC_AUDIENCE = os.getenv("OIDC_AUDIENCE", "account")
-JWK_URL = f"{OIDC_ISSUER}/protocol/openid-connect/certs"
-jwk_client = PyJWKClient(JWK_URL)
-http_bearer = HTTPBearer(auto_error=False)
-
-def verify_token(creds: HTTPAuthorizationCredentials = Depends(http_bearer)):
-    if creds is None:
-        raise HTTPException(status_code=401, detail="Missing bearer token")
-    token = creds.credentials
-    try:
-        signing_key = jwk_client.get_signing_key_from_jwt(token).key
-        # Be permissive on audience for local dev; tokens from Keycloak often use different audiences
-        payload = jwt.decode(
-            token,
-            signing_key,
-            algorithms=["RS256"],
-            options={"verify_exp": True, "verify_aud": False},
-        )
-        return payload
-    except Exception as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+from .profiling import ProfilerBusy, render_folded, sample_stacks
+from .ratelimit import rate_limit
+from .responses import ORJSONResponse, init_compression
+from .tracing import init_tracing
 
 PREFECT_API_URL = os.getenv("PREFECT_API_URL", "http://prefect:4200/api")
 AIRBYTE_API_URL = os.getenv("AIRBYTE_URL", "http://airbyte-server:8001/api/v1")
@@ -48,9 +25,11 @@ OIDC_CLIENT_SECRET = os.getenv("OIDC_CLIENT_SECRET", "")
 OIDC_REDIRECT_URI = os.getenv("OIDC_REDIRECT_URI", "")
 OIDC_TOKEN_ENDPOINT = f"{OIDC_ISSUER}/protocol/openid-connect/token"
 
-app = FastAPI(title="UDO API", version="0.1.0")
+app = FastAPI(title="UDO API", version="0.1.0", default_response_class=ORJSONResponse)
 app.include_router(ai_sql_router, prefix="/api/v1")
 init_instrumentation(app)
+init_tracing(app)
+init_compression(app)
 
 
 @app.get("/health")
@@ -165,7 +144,7 @@ async def openmetadata_proxy(full_path: str, request: Request):
         return Response(status_code=r.status_code, content=r.content, headers={"content-type": r.headers.get("content-type", "application/json")})
 
 
-@app.post("/trigger-sync")
+@app.post("/trigger-sync", dependencies=[Depends(rate_limit("trigger_sync"))])
 async def trigger_sync(connection_id: str | None = None):
     cid = connection_id or DEFAULT_CONNECTION_ID
     if not cid:
@@ -181,3 +160,15 @@ async def trigger_sync(connection_id: str | None = None):
 @app.get("/secure-info")
 async def secure_info(user=Depends(verify_token)):
     return {"message": "secured", "sub": user.get("sub"), "preferred_username": user.get("preferred_username")}
+
+
+@app.get("/admin/profile")
+def admin_profile(seconds: float = 10, interval_ms: float = 10, user=Depends(require_admin)):
+    """Sample this worker process for N seconds; returns folded stacks for flamegraph tools."""
+    if seconds <= 0 or interval_ms <= 0:
+        raise HTTPException(status_code=400, detail="seconds and interval_ms must be positive")
+    try:
+        stacks = sample_stacks(seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(render_folded(stacks), media_type="text/plain")
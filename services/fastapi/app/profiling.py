@@ -0,0 +1,82 @@
+"""On-demand sampling CPU profiler for the live gateway.
+
+The calling (threadpool) thread snapshots every other thread's stack via
+``sys._current_frames`` at a fixed interval and aggregates them in the "folded" format
+(``frame;frame;frame count``) understood by flamegraph.pl, speedscope and
+inferno. No extra dependency and negligible overhead when not running.
+
+Only threads that used CPU since the previous sample are counted (per-thread
+CPU time from ``/proc/self/task/<tid>/schedstat``), so an idle event loop in
+``select`` or threadpool workers parked in ``wait`` do not drown out real work.
+Without ``/proc`` (non-Linux) every thread is sampled, i.e. wall-clock stacks.
+
+The profile covers one process: with several gunicorn workers it only sees the
+worker that served the ``/admin/profile`` request.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+PROFILE_MAX_SECONDS = 60
+CPU_TIMES_AVAILABLE = os.path.isdir("/proc/self/task")
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already being captured."""
+
+
+def _fold(frame) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def _cpu_times() -> Optional[Dict[int, int]]:
+    """CPU nanoseconds used so far per thread ident, or None if not available."""
+    if not CPU_TIMES_AVAILABLE:
+        return None
+    times = {}
+    for thread in threading.enumerate():
+        try:
+            with open(f"/proc/self/task/{thread.native_id}/schedstat") as f:
+                times[thread.ident] = int(f.read().split()[0])
+        except (OSError, ValueError, IndexError):
+            continue
+    return times
+
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> Counter:
+    """Sample threads (except the caller) that ran on a CPU, for ``seconds``."""
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    try:
+        stacks: Counter = Counter()
+        caller = threading.get_ident()
+        deadline = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+        previous = _cpu_times()
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            current = _cpu_times()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == caller:
+                    continue
+                if current is not None and current.get(thread_id, 0) <= previous.get(thread_id, 0):
+                    continue  # idle since the last sample
+                stacks[_fold(frame)] += 1
+            previous = current
+        return stacks
+    finally:
+        _profile_lock.release()
+
+
+def render_folded(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
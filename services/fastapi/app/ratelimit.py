@@ -0,0 +1,227 @@
+"""Per-user admission control for expensive gateway routes.
+
+Each limited route gets a token bucket (``rate`` requests/second refilled up
+to ``burst``) and a cap on concurrent in-flight requests, both keyed on the
+verified JWT ``sub``. Over-limit requests are rejected immediately with 429
+and a ``Retry-After`` header.
+
+Limits default to ``DEFAULT_LIMITS`` and can be overridden per route with
+``RATE_LIMITS`` (JSON), e.g. ``{"ai_sql": {"rate": 2, "burst": 5, "concurrency": 1}}``.
+State lives in process memory unless ``RATE_LIMIT_REDIS_URL`` is set, in which
+case all workers share it through Redis.
+
+If Redis is unreachable the limiter fails open: requests are admitted without
+limits and counted in ``gateway_ratelimit_errors_total``, like the shared
+caches treat a failure as a miss. Alert on that counter rather than letting a
+Redis outage turn every limited request into a 500.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from fastapi import Depends, HTTPException
+from prometheus_client import Counter, Gauge
+
+from .auth import verify_token
+
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "")
+RATE_LIMIT_MAX_KEYS = 10000
+# Safety net so a crashed worker cannot leak concurrency slots in Redis forever
+CONCURRENCY_SLOT_TTL = 300
+
+THROTTLED = Counter(
+    "gateway_throttled_total", "Requests rejected by admission control", ["route", "reason"]
+)
+ADMITTED = Counter("gateway_admitted_total", "Requests admitted by admission control", ["route"])
+LIMITER_ERRORS = Counter(
+    "gateway_ratelimit_errors_total", "Admission checks skipped on backend errors", ["op"]
+)
+IN_FLIGHT = Gauge(
+    "gateway_limited_in_flight",
+    "In-flight requests on limited routes",
+    ["route"],
+    multiprocess_mode="livesum",
+)
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    rate: float
+    burst: int
+    concurrency: int
+
+
+DEFAULT_LIMITS: Dict[str, RouteLimit] = {
+    "ai_sql": RouteLimit(rate=2.0, burst=10, concurrency=2),
+    "trigger_sync": RouteLimit(rate=1 / 60, burst=3, concurrency=1),
+}
+
+
+def load_limits() -> Dict[str, RouteLimit]:
+    limits = dict(DEFAULT_LIMITS)
+    for route, cfg in json.loads(os.getenv("RATE_LIMITS") or "{}").items():
+        base = limits.get(route, RouteLimit(rate=1.0, burst=5, concurrency=1))
+        limits[route] = RouteLimit(
+            rate=float(cfg.get("rate", base.rate)),
+            burst=int(cfg.get("burst", base.burst)),
+            concurrency=int(cfg.get("concurrency", base.concurrency)),
+        )
+    return limits
+
+
+class MemoryBackend:
+    def __init__(self):
+        # key -> (tokens, last refill, rate, burst)
+        self._buckets: Dict[str, Tuple[float, float, float, int]] = {}
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        # Drop buckets that have refilled completely; they carry no state
+        full = [
+            k
+            for k, (tokens, ts, rate, burst) in self._buckets.items()
+            if tokens + (now - ts) * rate >= burst
+        ]
+        for k in full:
+            del self._buckets[k]
+
+    async def take(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (burst, now))[:2]
+            tokens = min(burst, tokens + (now - ts) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now, rate, burst)
+                if len(self._buckets) > RATE_LIMIT_MAX_KEYS:
+                    self._prune(now)
+                return True, 0.0
+            self._buckets[key] = (tokens, now, rate, burst)
+            return False, (1 - tokens) / rate
+
+    async def acquire(self, key: str, limit: int) -> bool:
+        with self._lock:
+            if self._active.get(key, 0) >= limit:
+                return False
+            self._active[key] = self._active.get(key, 0) + 1
+            return True
+
+    async def release(self, key: str) -> None:
+        with self._lock:
+            remaining = self._active.get(key, 0) - 1
+            if remaining > 0:
+                self._active[key] = remaining
+            else:
+                self._active.pop(key, None)
+
+
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+else
+  retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry)}
+"""
+
+# Never below zero: a slot admitted while Redis was down was never counted
+_RELEASE_LUA = """
+if tonumber(redis.call('GET', KEYS[1]) or '0') > 0 then
+  return redis.call('DECR', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._errors = (redis.RedisError,)
+        self._bucket = self._redis.register_script(_TOKEN_BUCKET_LUA)
+        self._release = self._redis.register_script(_RELEASE_LUA)
+
+    async def take(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        try:
+            allowed, retry = await self._bucket(
+                keys=[f"ratelimit:bucket:{key}"], args=[rate, burst]
+            )
+        except self._errors:
+            LIMITER_ERRORS.labels("take").inc()
+            return True, 0.0
+        return bool(allowed), float(retry)
+
+    async def acquire(self, key: str, limit: int) -> bool:
+        slot = f"ratelimit:active:{key}"
+        try:
+            count = await self._redis.incr(slot)
+            await self._redis.expire(slot, CONCURRENCY_SLOT_TTL)
+            if count > limit:
+                await self._redis.decr(slot)
+                return False
+        except self._errors:
+            LIMITER_ERRORS.labels("acquire").inc()
+        return True
+
+    async def release(self, key: str) -> None:
+        try:
+            await self._release(keys=[f"ratelimit:active:{key}"])
+        except self._errors:
+            LIMITER_ERRORS.labels("release").inc()
+
+
+limits = load_limits()
+backend = RedisBackend(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else MemoryBackend()
+
+
+def _reject(route: str, reason: str, retry_after: float, detail: str):
+    THROTTLED.labels(route, reason).inc()
+    raise HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def rate_limit(route: str):
+    """Dependency enforcing ``limits[route]`` for the authenticated caller."""
+
+    async def dependency(user=Depends(verify_token)):
+        limit = limits.get(route)
+        if limit is None:
+            yield
+            return
+        key = f"{route}:{user.get('sub', 'anonymous')}"
+        allowed, retry_after = await backend.take(key, limit.rate, limit.burst)
+        if not allowed:
+            _reject(route, "rate", retry_after, "Rate limit exceeded")
+        if not await backend.acquire(key, limit.concurrency):
+            _reject(route, "concurrency", 1, "Too many concurrent requests")
+        ADMITTED.labels(route).inc()
+        IN_FLIGHT.labels(route).inc()
+        try:
+            yield
+        finally:
+            IN_FLIGHT.labels(route).dec()
+            await backend.release(key)
+
+    return dependency
@@ -0,0 +1,124 @@
+"""Query planning for grouped ROI questions, with rewrite onto rollup tables.
+
+The Prefect flows maintain rollup tables (services/prefect/flows/rollups.py)
+holding additive measures ``n``, ``n_roi``, ``sum_roi``, ``sum_revenue``,
+``sum_cost`` per dimension tuple, and list them in ``rollup_catalog``. A question is parsed
+into a ``QuerySpec``; if any rollup's dimensions cover the spec's, the query is
+compiled against the smallest such rollup (re-aggregating when it is finer
+grained), otherwise against the base ``products`` / ``product_categories`` tables.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+CATALOG_TABLE = "rollup_catalog"
+
+# measure -> (expression over base tables, expression over a rollup)
+MEASURES: Dict[str, Tuple[str, str]] = {
+    "avg_roi": ("avg(m.roi)", "sum(sum_roi) / sum(n_roi)"),
+    "revenue": ("sum(m.revenue)", "sum(sum_revenue)"),
+    "cost": ("sum(m.cost)", "sum(sum_cost)"),
+    "products": ("count(*)", "sum(n)"),
+}
+DIMENSIONS: Dict[str, str] = {
+    "category": "coalesce(c.category, 'unknown')",
+    "day": "date_trunc('day', m.loaded_at)",
+}
+
+# Rollups written before n_roi existed cannot answer avg_roi correctly
+ROLLUP_COLUMNS = {"n", "n_roi", "sum_roi", "sum_revenue", "sum_cost"}
+
+_TOP_N_RE = re.compile(r"\b(?:top|bottom)\s+(\d+)")
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    dimensions: Tuple[str, ...]
+    measures: Tuple[str, ...]
+    order_by: Optional[str] = None
+    descending: bool = True
+    limit: Optional[int] = None
+
+
+def parse_question(question: str) -> Optional[QuerySpec]:
+    """Map a grouped ROI / revenue / cost question to a spec; None if it is not one."""
+    q = question.lower()
+    dimensions = []
+    if any(w in q for w in ("daily", "by day", "per day", "trend", "over time")):
+        dimensions.append("day")
+    if "categor" in q:
+        dimensions.append("category")
+    if not dimensions:
+        return None
+    measures = tuple(
+        m
+        for m, words in (("avg_roi", ("roi",)), ("revenue", ("revenue",)), ("cost", ("cost",)))
+        if any(w in q for w in words)
+    ) or ("avg_roi", "revenue", "cost")
+    order_by, descending = None, True
+    if any(w in q for w in ("top", "best", "highest", "most")):
+        order_by = measures[0]
+    elif any(w in q for w in ("bottom", "worst", "lowest", "least")):
+        order_by, descending = measures[0], False
+    elif "day" in dimensions:
+        order_by, descending = "day", False
+    match = _TOP_N_RE.search(q)
+    return QuerySpec(
+        dimensions=tuple(dimensions),
+        measures=measures,
+        order_by=order_by,
+        descending=descending,
+        limit=int(match.group(1)) if match else None,
+    )
+
+
+def load_catalog(con) -> Dict[str, Tuple[str, ...]]:
+    """Rollup name -> dimensions, from the catalog the flows maintain (empty if absent)."""
+    tables = {t[0] for t in con.execute("show tables").fetchall()}
+    if CATALOG_TABLE not in tables:
+        return {}
+    rows = con.execute(f"SELECT name, dimensions FROM {CATALOG_TABLE}").fetchall()
+    return {
+        name: tuple(dims.split(","))
+        for name, dims in rows
+        if name in tables and ROLLUP_COLUMNS <= _columns(con, name)
+    }
+
+
+def _columns(con, table: str) -> set:
+    return {col[0] for col in con.execute(f"DESCRIBE {table}").fetchall()}
+
+
+def base_supports(spec: QuerySpec, con) -> bool:
+    """Day-grained specs need ``products.loaded_at`` when no rollup covers them."""
+    return "day" not in spec.dimensions or "loaded_at" in _columns(con, "products")
+
+
+def choose_rollup(spec: QuerySpec, catalog: Dict[str, Tuple[str, ...]]) -> Optional[str]:
+    covering = [
+        (len(dims), name) for name, dims in catalog.items() if set(spec.dimensions) <= set(dims)
+    ]
+    return min(covering)[1] if covering else None
+
+
+def compile_query(spec: QuerySpec, rollup: Optional[str] = None) -> str:
+    dims = ", ".join(spec.dimensions)
+    if rollup:
+        select = ", ".join(f"{MEASURES[m][1]} AS {m}" for m in spec.measures)
+        sql = f"SELECT {dims}, {select} FROM {rollup} GROUP BY {dims}"
+    else:
+        dim_select = ", ".join(f"{DIMENSIONS[d]} AS {d}" for d in spec.dimensions)
+        select = ", ".join(f"{MEASURES[m][0]} AS {m}" for m in spec.measures)
+        # Same rows as the flows' time rollups, which leave out undated products
+        where = "WHERE m.loaded_at IS NOT NULL " if "day" in spec.dimensions else ""
+        sql = (
+            f"SELECT {dim_select}, {select} FROM products m "
+            f"LEFT JOIN product_categories c ON m.product_id = c.product_id "
+            f"{where}GROUP BY {dims}"
+        )
+    if spec.order_by:
+        sql += f" ORDER BY {spec.order_by} {'DESC' if spec.descending else 'ASC'}"
+    if spec.limit:
+        sql += f" LIMIT {spec.limit}"
+    return sql
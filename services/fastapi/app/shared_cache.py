@@ -0,0 +1,118 @@
+"""Byte caches shared by every gateway worker.
+
+With ``SHARED_CACHE_REDIS_URL`` (falling back to ``RATE_LIMIT_REDIS_URL``) set,
+entries live in Redis and are shared across workers and replicas. Otherwise
+they are files under ``SHARED_CACHE_DIR`` (tmpfs ``/dev/shm`` when available),
+which all workers on the host see. Either way a cache failure is a miss, never
+a request error.
+
+Callers serialise values themselves; keys are namespaced and hashed.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from typing import Optional
+
+SHARED_CACHE_REDIS_URL = os.getenv("SHARED_CACHE_REDIS_URL") or os.getenv(
+    "RATE_LIMIT_REDIS_URL", ""
+)
+SHARED_CACHE_DIR = os.getenv("SHARED_CACHE_DIR") or os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "udo-cache"
+)
+SHARED_CACHE_MAX_FILES = int(os.getenv("SHARED_CACHE_MAX_FILES", "10000"))
+
+
+def _digest(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class FileCache:
+    """One file per entry: 8-byte big-endian expiry (ms) followed by the value."""
+
+    def __init__(
+        self,
+        namespace: str,
+        directory: str = SHARED_CACHE_DIR,
+        max_files: int = SHARED_CACHE_MAX_FILES,
+    ):
+        self.directory = os.path.join(directory, namespace)
+        self.max_files = max_files
+        self._writes = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, _digest(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < 8 or int.from_bytes(data[:8], "big") < time.time() * 1000:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return data[8:]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        path = self._path(key)
+        expires = int((time.time() + ttl) * 1000).to_bytes(8, "big")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(expires + value)
+            # Atomic swap: concurrent readers see the old or the new entry, never half of one
+            os.replace(tmp, path)
+        except OSError:
+            return
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Drop the oldest entries once the namespace exceeds ``max_files``."""
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.is_file()]
+            if len(entries) <= self.max_files:
+                return
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[: len(entries) - self.max_files]:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+class RedisCache:
+    def __init__(self, namespace: str, url: str):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._errors = (redis.RedisError,)
+        self.namespace = namespace
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{_digest(key)}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._redis.get(self._key(key))
+        except self._errors:
+            return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            self._redis.set(self._key(key), value, px=int(ttl * 1000))
+        except self._errors:
+            pass
+
+
+def shared_cache(namespace: str):
+    if SHARED_CACHE_REDIS_URL:
+        return RedisCache(namespace, SHARED_CACHE_REDIS_URL)
+    return FileCache(namespace)
@@ -0,0 +1,99 @@
+"""Read-only access to DuckDB snapshots published by the Prefect flows.
+
+The flows write ``snapshot-<version>.duckdb`` files plus a ``CURRENT`` pointer
+into ``DUCKDB_SNAPSHOT_DIR`` (see services/prefect/flows/snapshots.py). The
+gateway keeps one read-only connection to the newest snapshot and hands out a
+cursor per query. When the pointer moves, new queries go to the new snapshot
+and the old connection is closed once its last cursor is returned.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+import duckdb
+
+from .tracing import tracer
+
+CURRENT_POINTER = "CURRENT"
+
+
+class NoSnapshot(Exception):
+    """Raised when nothing has been published to the snapshot directory yet."""
+
+
+class _Snapshot:
+    def __init__(self, path: str):
+        self.path = path
+        with tracer.start_as_current_span("duckdb.connect", attributes={"duckdb.path": path}):
+            self.con = duckdb.connect(path, read_only=True)
+        self.refs = 0
+        self.retired = False
+
+
+class SnapshotReader:
+    def __init__(self, snapshot_dir: str):
+        self.snapshot_dir = snapshot_dir
+        self._pointer = os.path.join(snapshot_dir, CURRENT_POINTER)
+        # (st_ino, st_mtime_ns): publishes os.replace CURRENT, so the inode changes even
+        # when coarse timestamps do not
+        self._pointer_stamp: Optional[Tuple[int, int]] = None
+        self._active: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> Optional[str]:
+        return os.path.basename(self._active.path) if self._active else None
+
+    def _refresh(self) -> None:
+        """Switch to the snapshot named by CURRENT if it changed. Caller holds the lock."""
+        try:
+            st = os.stat(self._pointer)
+        except FileNotFoundError:
+            return
+        stamp = (st.st_ino, st.st_mtime_ns)
+        if stamp == self._pointer_stamp and self._active is not None:
+            return
+        with open(self._pointer) as f:
+            path = os.path.join(self.snapshot_dir, f.read().strip())
+        self._pointer_stamp = stamp
+        if self._active is not None and self._active.path == path:
+            return
+        previous, self._active = self._active, _Snapshot(path)
+        if previous is not None:
+            previous.retired = True
+            if previous.refs == 0:
+                previous.con.close()
+
+    @contextmanager
+    def cursor(self):
+        with self.versioned_cursor() as (cur, _):
+            yield cur
+
+    @contextmanager
+    def versioned_cursor(self):
+        """Like ``cursor`` but also yields the snapshot file name the cursor reads."""
+        with self._lock:
+            self._refresh()
+            snapshot = self._active
+            if snapshot is None:
+                raise NoSnapshot(f"no snapshot published in {self.snapshot_dir}")
+            snapshot.refs += 1
+            cur = snapshot.con.cursor()
+        try:
+            yield cur, os.path.basename(snapshot.path)
+        finally:
+            cur.close()
+            with self._lock:
+                snapshot.refs -= 1
+                if snapshot.retired and snapshot.refs == 0:
+                    snapshot.con.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._active is not None:
+                self._active.retired = True
+                if self._active.refs == 0:
+                    self._active.con.close()
+                self._active = None
@@ -0,0 +1,66 @@
+"""OpenTelemetry tracing for the gateway.
+
+Spans are exported when either variable is set:
+ - OTEL_EXPORTER_OTLP_ENDPOINT: OTLP/HTTP collector (e.g. http://otel-collector:4318)
+ - OTEL_TRACES_FILE: append one JSON span per line to a local file
+Otherwise the tracer is a no-op. Outgoing httpx calls are instrumented so
+trace context propagates to Keycloak, OpenMetadata and Airbyte.
+"""
+
+import json
+import os
+
+from fastapi import FastAPI, Request
+from opentelemetry import propagate, trace
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "udo-gateway")
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+OTEL_TRACES_FILE = os.getenv("OTEL_TRACES_FILE", "")
+
+tracer = trace.get_tracer("udo.gateway")
+
+
+def _span_exporters():
+    if OTEL_EXPORTER_OTLP_ENDPOINT:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        yield OTLPSpanExporter(endpoint=f"{OTEL_EXPORTER_OTLP_ENDPOINT.rstrip('/')}/v1/traces")
+    if OTEL_TRACES_FILE:
+        out = open(OTEL_TRACES_FILE, "a")
+        yield ConsoleSpanExporter(
+            out=out, formatter=lambda span: json.dumps(json.loads(span.to_json())) + "\n"
+        )
+
+
+def configure_tracer_provider() -> bool:
+    exporters = list(_span_exporters())
+    if not exporters:
+        return False
+    provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+    for exporter in exporters:
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return True
+
+
+async def tracing_middleware(request: Request, call_next):
+    ctx = propagate.extract(request.headers)
+    with tracer.start_as_current_span(
+        f"{request.method} {request.url.path}",
+        context=ctx,
+        kind=trace.SpanKind.SERVER,
+        attributes={"http.method": request.method, "http.target": request.url.path},
+    ) as span:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        return response
+
+
+def init_tracing(app: FastAPI):
+    if configure_tracer_provider():
+        HTTPXClientInstrumentor().instrument()
+        app.middleware("http")(tracing_middleware)
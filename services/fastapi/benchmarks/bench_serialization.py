@@ -0,0 +1,71 @@
+"""Micro-benchmark: gateway JSON serialisation and compression of ai-sql payloads.
+
+Compares FastAPI's default path (``jsonable_encoder`` + ``json.dumps`` via
+``JSONResponse``) with ``app.responses.ORJSONResponse`` on a DuckDB result set
+shaped like ``/api/v1/ai-sql`` output, then the cost and ratio of compressing
+the rendered body.
+
+    python benchmarks/bench_serialization.py --rows 10000 --repeat 20
+"""
+
+import argparse
+import gzip
+import pathlib
+import sys
+import timeit
+
+import duckdb
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app.responses import GZIP_LEVEL, ZSTD_LEVEL, ORJSONResponse, zstandard  # noqa: E402
+
+
+def build_payload(rows: int) -> dict:
+    sql = (
+        "SELECT i AS product_id, (i % 977 / 100.0)::DECIMAL(10, 2) AS roi, "
+        "(i * 13.37)::DECIMAL(18, 2) AS revenue, DATE '2024-01-01' + (i % 365)::INTEGER AS day, "
+        "TIMESTAMP '2024-01-01' + to_seconds(i) AS loaded_at, 'category-' || (i % 40) AS category "
+        f"FROM range({rows}) t(i)"
+    )
+    results = duckdb.sql(sql).fetchall()
+    return {"sql": sql, "results": results, "rollup": None}
+
+
+def bench(label: str, fn, repeat: int) -> float:
+    best = min(timeit.repeat(fn, number=1, repeat=repeat))
+    print(f"  {label:<34} {best * 1000:9.2f} ms")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payload = build_payload(args.rows)
+    print(f"serialise {args.rows} rows (best of {args.repeat})")
+    before = bench(
+        "jsonable_encoder + JSONResponse",
+        lambda: JSONResponse(jsonable_encoder(payload)).body,
+        args.repeat,
+    )
+    after = bench("ORJSONResponse", lambda: ORJSONResponse(payload).body, args.repeat)
+    print(f"  speedup                            {before / after:9.1f}x")
+
+    body = ORJSONResponse(payload).body
+    print(f"compress {len(body)} byte body")
+    codecs = {"gzip": lambda: gzip.compress(body, GZIP_LEVEL)}
+    if zstandard is not None:
+        zstd = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        codecs["zstd"] = lambda: zstd.compress(body)
+    for name, fn in codecs.items():
+        size = len(fn())
+        bench(f"{name} ({size} bytes, {len(body) / size:.1f}x)", fn, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Gunicorn settings for running the gateway on several uvicorn workers.
+
+    gunicorn -c gunicorn_conf.py app.main:app
+
+WEB_CONCURRENCY sets the worker count. It defaults to one per CPU when
+RATE_LIMIT_REDIS_URL is set and to a single worker otherwise, because the
+in-memory rate limiter is per process: N workers would silently multiply every
+per-user limit by N (a warning is logged if that is configured). Metrics from all
+workers are aggregated through PROMETHEUS_MULTIPROC_DIR, which has to be in the
+environment before any worker imports prometheus_client, so it is defaulted
+here. JWKS and ai-sql result caches are shared through the same Redis or,
+without it, through files under SHARED_CACHE_DIR.
+"""
+
+import multiprocessing
+import os
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-multiproc")
+
+from prometheus_client import multiprocess  # noqa: E402
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "")
+workers = int(
+    os.getenv("WEB_CONCURRENCY") or (multiprocessing.cpu_count() if RATE_LIMIT_REDIS_URL else 1)
+)
+worker_class = "uvicorn.workers.UvicornWorker"
+# Longer than the 60s cap on /admin/profile sampling
+graceful_timeout = 75
+
+
+def on_starting(server):
+    """Warn about per-worker rate limits and start from an empty metrics directory
+    (files from a previous run would be summed in)."""
+    if workers > 1 and not RATE_LIMIT_REDIS_URL:
+        server.log.warning(
+            "%d workers without RATE_LIMIT_REDIS_URL: per-user rate and concurrency limits "
+            "are enforced per worker, i.e. multiplied by %d",
+            workers,
+            workers,
+        )
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges so they are not reported forever."""
+    multiprocess.mark_process_dead(worker.pid, os.environ["PROMETHEUS_MULTIPROC_DIR"])
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+import duckdb
+from fastapi.testclient import TestClient
+from jwt import PyJWKClient
+
+from app import ai_sql, auth, ratelimit
+from app.main import app, verify_token
+from app.ratelimit import MemoryBackend
+from app.shared_cache import FileCache
+from app.snapshots import SnapshotReader
+
+JWKS = {"keys": [{"kty": "oct", "kid": "k1", "k": "c2VjcmV0", "alg": "HS256"}]}
+
+
+def test_file_cache_round_trip_expiry_and_prune(tmp_path):
+    cache = FileCache("t", str(tmp_path), max_files=3)
+    cache.set("a", b"1", ttl=60)
+    assert FileCache("t", str(tmp_path)).get("a") == b"1"  # visible to other processes
+    cache.set("b", b"2", ttl=-1)
+    assert cache.get("b") is None
+    for i in range(5):
+        cache.set(f"k{i}", b"x", ttl=60)
+        os.utime(cache._path(f"k{i}"), (i + 1, i + 1))
+    os.utime(cache._path("a"), (0, 0))
+    cache._prune()
+    assert len(os.listdir(cache.directory)) == 3
+    assert cache.get("k4") == b"x" and cache.get("a") is None
+
+
+def test_jwks_fetched_once_across_clients(tmp_path, monkeypatch):
+    calls = []
+
+    def fetch(self):
+        calls.append(self.uri)
+        return JWKS
+
+    monkeypatch.setattr(auth, "jwks_cache", FileCache("jwks", str(tmp_path)))
+    monkeypatch.setattr(PyJWKClient, "fetch_data", fetch)
+    first = auth.SharedJWKClient("http://issuer/certs")
+    second = auth.SharedJWKClient("http://issuer/certs")  # stands in for another worker
+    assert first.get_signing_key("k1").key_id == "k1"
+    assert second.get_signing_key("k1").key_id == "k1"
+    assert len(calls) == 1
+    # Key rotation forces a refetch rather than trusting the shared copy
+    second.get_jwk_set(refresh=True)
+    assert len(calls) == 2
+
+
+def test_ai_sql_results_cached_per_snapshot(tmp_path, monkeypatch):
+    con = duckdb.connect(str(tmp_path / "snapshot-1.duckdb"))
+    con.execute("CREATE TABLE products AS SELECT 7 AS product_id, 0.5 AS roi")
+    con.close()
+    (tmp_path / "CURRENT").write_text("snapshot-1.duckdb")
+    reader = SnapshotReader(str(tmp_path))
+    monkeypatch.setattr(ai_sql, "snapshot_reader", reader)
+    monkeypatch.setattr(ai_sql, "result_cache", FileCache("ai_sql", str(tmp_path / "cache")))
+    monkeypatch.setattr(ratelimit, "backend", MemoryBackend())
+    app.dependency_overrides[verify_token] = lambda: {"sub": "alice"}
+    try:
+        client = TestClient(app)
+        first = client.post("/api/v1/ai-sql", json={"q": "top roi products"})
+        second = client.post("/api/v1/ai-sql", json={"q": "top roi products"})
+    finally:
+        app.dependency_overrides.clear()
+        reader.close()
+    assert first.headers["x-cache"] == "miss" and second.headers["x-cache"] == "hit"
+    assert first.json() == second.json()
+    assert second.json()["results"] == [[7, 0.5]]
+
+
+def test_metrics_aggregate_across_worker_processes(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    worker = (
+        "from app.instrumentation import REQUEST_COUNT;"
+        "REQUEST_COUNT.labels('GET', '/x', 200).inc()"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], env=env, check=True)
+    scrape = "from app.instrumentation import metrics; print(metrics().body.decode())"
+    out = subprocess.run(
+        [sys.executable, "-c", scrape], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    assert 'fastapi_requests_total{method="GET",path="/x",status="200"} 2.0' in out
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app, verify_token
+from app.profiling import CPU_TIMES_AVAILABLE, render_folded, sample_stacks
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def idle_wait(stop):
+    stop.wait()
+
+
+def test_sample_stacks_captures_other_threads():
+    stop = threading.Event()
+    workers = [threading.Thread(target=f, args=(stop,)) for f in (busy_loop, idle_wait)]
+    for worker in workers:
+        worker.start()
+    time.sleep(0.05)  # let idle_wait park before sampling starts
+    try:
+        stacks = sample_stacks(0.2, interval=0.01)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+    folded = render_folded(stacks)
+    assert "busy_loop" in folded
+    if CPU_TIMES_AVAILABLE:
+        assert "idle_wait" not in folded
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+
+
+def test_profile_endpoint_requires_admin_role():
+    client = TestClient(app)
+    app.dependency_overrides[verify_token] = lambda: {"sub": "u1", "realm_access": {"roles": []}}
+    try:
+        assert client.get("/admin/profile?seconds=0.05").status_code == 403
+        app.dependency_overrides[verify_token] = lambda: {"realm_access": {"roles": ["admin"]}}
+        started = time.monotonic()
+        resp = client.get("/admin/profile?seconds=0.05&interval_ms=5")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        assert time.monotonic() - started < 5
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import ratelimit
+from app.main import app, verify_token
+from app.ratelimit import MemoryBackend, RouteLimit
+
+
+def test_memory_bucket_refills_over_time():
+    async def scenario():
+        backend = MemoryBackend()
+        assert (await backend.take("k", rate=1000, burst=1))[0]
+        allowed, retry_after = await backend.take("k", rate=1000, burst=1)
+        assert not allowed and 0 < retry_after <= 0.001
+        await asyncio.sleep(0.01)
+        assert (await backend.take("k", rate=1000, burst=1))[0]
+
+    asyncio.run(scenario())
+
+
+def test_memory_concurrency_cap():
+    async def scenario():
+        backend = MemoryBackend()
+        assert await backend.acquire("k", 1)
+        assert not await backend.acquire("k", 1)
+        await backend.release("k")
+        assert await backend.acquire("k", 1)
+
+    asyncio.run(scenario())
+
+
+def test_ai_sql_rejects_over_limit_per_user(monkeypatch):
+    monkeypatch.setattr(ratelimit, "backend", MemoryBackend())
+    monkeypatch.setitem(ratelimit.limits, "ai_sql", RouteLimit(rate=0.001, burst=1, concurrency=1))
+    client = TestClient(app)
+    try:
+        app.dependency_overrides[verify_token] = lambda: {"sub": "alice"}
+        # Unsupported question: admitted by the limiter, rejected by the route
+        assert client.post("/api/v1/ai-sql", json={"q": "hello"}).status_code == 400
+        throttled = client.post("/api/v1/ai-sql", json={"q": "hello"})
+        assert throttled.status_code == 429
+        assert int(throttled.headers["retry-after"]) >= 1
+        app.dependency_overrides[verify_token] = lambda: {"sub": "bob"}
+        assert client.post("/api/v1/ai-sql", json={"q": "hello"}).status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_ai_sql_requires_token():
+    assert TestClient(app).post("/api/v1/ai-sql", json={"q": "top roi"}).status_code == 401
+
+
+def test_unreachable_redis_fails_open(monkeypatch):
+    pytest.importorskip("redis")
+    monkeypatch.setattr(ratelimit, "backend", ratelimit.RedisBackend("redis://127.0.0.1:1/0"))
+    client = TestClient(app)
+    try:
+        app.dependency_overrides[verify_token] = lambda: {"sub": "alice"}
+        # Admitted despite the outage; the route itself rejects the question
+        assert client.post("/api/v1/ai-sql", json={"q": "hello"}).status_code == 400
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,89 @@
+import datetime
+import decimal
+import gzip
+
+import numpy as np
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.responses import CompressionMiddleware, ORJSONResponse, negotiate_encoding
+
+
+def test_orjson_response_handles_duckdb_types():
+    body = ORJSONResponse(
+        {
+            "rows": [(1, decimal.Decimal("1.25"), decimal.Decimal("7"), datetime.date(2024, 1, 2))],
+            "lag": datetime.timedelta(minutes=1),
+            "blob": b"\x00\x01",
+            "array": np.arange(3, dtype=np.int64),
+            "scalar": np.float64(0.5),
+            "strided": np.arange(6)[::2],
+        }
+    ).body
+    assert orjson.loads(body) == {
+        "rows": [[1, 1.25, 7, "2024-01-02"]],
+        "lag": 60.0,
+        "blob": "AAE=",
+        "array": [0, 1, 2],
+        "scalar": 0.5,
+        "strided": [0, 2, 4],
+    }
+
+
+def test_negotiate_encoding_honours_q_values():
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, br") is None
+    assert negotiate_encoding("*") in ("zstd", "gzip")
+
+
+def _app():
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/large")
+    def large():
+        return {"rows": [[i, "x" * 10] for i in range(200)]}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((b"chunk %d\n" % i for i in range(50)), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def test_compresses_large_bodies_only():
+    client = _app()
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    large = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.headers["vary"] == "Accept-Encoding"
+    assert len(large.json()["rows"]) == 200
+    plain = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+
+def test_streamed_body_is_compressed_incrementally():
+    client = _app()
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as resp:
+        assert resp.headers["content-encoding"] == "gzip"
+        assert "content-length" not in resp.headers
+        raw = b"".join(resp.iter_raw())
+    assert gzip.decompress(raw).startswith(b"chunk 0\nchunk 1\n")
+
+
+def test_zstd_preferred_when_available():
+    zstandard = pytest.importorskip("zstandard")
+    with _app().stream("GET", "/large", headers={"Accept-Encoding": "gzip, zstd"}) as resp:
+        assert resp.headers["content-encoding"] == "zstd"
+        raw = b"".join(resp.iter_raw())
+    body = zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    assert len(orjson.loads(body)["rows"]) == 200
@@ -0,0 +1,76 @@
+import duckdb
+from fastapi.testclient import TestClient
+
+from app import ai_sql, ratelimit
+from app.main import app, verify_token
+from app.ratelimit import MemoryBackend
+from app.rollups import choose_rollup, compile_query, load_catalog, parse_question
+
+
+def test_parse_grouped_questions():
+    spec = parse_question("top 3 categories by roi")
+    assert spec.dimensions == ("category",)
+    assert spec.measures == ("avg_roi",)
+    assert (spec.order_by, spec.descending, spec.limit) == ("avg_roi", True, 3)
+    assert parse_question("daily revenue trend").dimensions == ("day",)
+    assert parse_question("top roi products") is None
+
+
+def test_choose_smallest_covering_rollup():
+    catalog = {"by_day_cat": ("day", "category"), "by_cat": ("category",)}
+    assert choose_rollup(parse_question("roi by category"), catalog) == "by_cat"
+    assert choose_rollup(parse_question("daily roi"), catalog) == "by_day_cat"
+    assert choose_rollup(parse_question("daily roi"), {"by_cat": ("category",)}) is None
+
+
+def test_rollup_rewrite_matches_base_query():
+    con = duckdb.connect()
+    con.execute(
+        "CREATE TABLE products AS SELECT * FROM (VALUES "
+        "(1, 0.5, 100.0, 50.0), (2, NULL, 200.0, 150.0), (3, 0.9, 50.0, 5.0)"
+        ") t(product_id, roi, revenue, cost)"
+    )
+    con.execute(
+        "CREATE TABLE product_categories AS SELECT * FROM (VALUES "
+        "(1, 'retail'), (2, 'retail'), (3, 'software')) t(product_id, category)"
+    )
+    con.execute(
+        "CREATE TABLE rollup_by_category AS SELECT coalesce(c.category, 'unknown') AS category, "
+        "count(*) AS n, count(roi) AS n_roi, sum(roi) AS sum_roi, "
+        "sum(revenue) AS sum_revenue, sum(cost) AS sum_cost "
+        "FROM products m LEFT JOIN product_categories c USING (product_id) GROUP BY 1"
+    )
+    con.execute("CREATE TABLE rollup_catalog(name VARCHAR, dimensions VARCHAR)")
+    con.execute("INSERT INTO rollup_catalog VALUES ('rollup_by_category', 'category')")
+
+    spec = parse_question("roi and revenue by category")
+    rollup = choose_rollup(spec, load_catalog(con))
+    assert rollup == "rollup_by_category"
+    from_rollup = con.execute(compile_query(spec, rollup) + " ORDER BY category").fetchall()
+    from_base = con.execute(compile_query(spec) + " ORDER BY category").fetchall()
+    assert from_rollup == from_base
+    # A rollup from before n_roi existed is not used for rewrites
+    con.execute("ALTER TABLE rollup_by_category DROP COLUMN n_roi")
+    assert load_catalog(con) == {}
+
+
+def test_daily_question_without_loaded_at_is_rejected(monkeypatch, tmp_path):
+    metrics = tmp_path / "products_metrics.csv"
+    metrics.write_text("product_id,roi,revenue,cost\n1,0.55,100000,45000\n2,0.48,80000,41600\n")
+    products = tmp_path / "products.csv"
+    products.write_text(
+        "product_id,description,category\n1,Widget A,retail\n2,Gadget B,logistics\n"
+    )
+    monkeypatch.setattr(ai_sql, "PRODUCTS_METRICS_CSV", str(metrics))
+    monkeypatch.setattr(ai_sql, "PRODUCTS_CSV", str(products))
+    monkeypatch.setattr(ai_sql, "DUCKDB_PATH", ":memory:")
+    monkeypatch.setattr(ratelimit, "backend", MemoryBackend())
+    app.dependency_overrides[verify_token] = lambda: {"sub": "alice"}
+    try:
+        client = TestClient(app)
+        daily = client.post("/api/v1/ai-sql", json={"q": "daily revenue trend"})
+        by_category = client.post("/api/v1/ai-sql", json={"q": "revenue by category"})
+    finally:
+        app.dependency_overrides.clear()
+    assert daily.status_code == 400
+    assert by_category.status_code == 200 and by_category.json()["rollup"] is None
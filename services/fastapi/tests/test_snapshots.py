@@ -0,0 +1,38 @@
+import os
+
+import duckdb
+import pytest
+
+from app.snapshots import NoSnapshot, SnapshotReader
+
+
+def publish(snapshot_dir, name, value):
+    con = duckdb.connect(os.path.join(snapshot_dir, name))
+    con.execute("CREATE TABLE t AS SELECT ? AS v", [value])
+    con.close()
+    tmp = os.path.join(snapshot_dir, ".CURRENT.tmp")
+    with open(tmp, "w") as f:
+        f.write(name)
+    os.replace(tmp, os.path.join(snapshot_dir, "CURRENT"))
+
+
+def test_reader_requires_published_snapshot(tmp_path):
+    reader = SnapshotReader(str(tmp_path))
+    with pytest.raises(NoSnapshot):
+        with reader.cursor():
+            pass
+
+
+def test_reader_switches_and_drains_old_snapshot(tmp_path):
+    reader = SnapshotReader(str(tmp_path))
+    publish(str(tmp_path), "snapshot-1.duckdb", 1)
+    with reader.cursor() as old_cur:
+        assert old_cur.execute("SELECT v FROM t").fetchone() == (1,)
+        publish(str(tmp_path), "snapshot-2.duckdb", 2)
+        with reader.cursor() as new_cur:
+            assert new_cur.execute("SELECT v FROM t").fetchone() == (2,)
+        # The in-flight reader keeps its snapshot until it finishes
+        assert old_cur.execute("SELECT v FROM t").fetchone() == (1,)
+    assert reader.version == "snapshot-2.duckdb"
+    # A writer can open the retired file once its readers have drained
+    duckdb.connect(str(tmp_path / "snapshot-1.duckdb")).close()
@@ -1,9 +1,29 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from langchain_core.globals import set_llm_cache
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from llm_cache import LLMCache
+from llm_cache.langchain import LangChainCache
 
 app = FastAPI(title="LangChain API", version="0.1.0")
 
+# Every LLM call made through LangChain goes through the shared response cache
+response_cache = LLMCache(namespace="langchain")
+set_llm_cache(LangChainCache(response_cache))
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return response_cache.stats()
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # Placeholder for future chain endpoints
@@ -0,0 +1,14 @@
+"""Shared exact + semantic response cache for the UDO LLM services."""
+
+from .cache import CacheHit, LLMCache, cache_key, normalize_prompt
+from .embeddings import HashingEmbedder, SentenceTransformerEmbedder, embedder_from_env
+
+__all__ = [
+    "CacheHit",
+    "LLMCache",
+    "cache_key",
+    "normalize_prompt",
+    "HashingEmbedder",
+    "SentenceTransformerEmbedder",
+    "embedder_from_env",
+]
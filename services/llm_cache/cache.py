@@ -0,0 +1,169 @@
+"""Two-tier LLM response cache.
+
+Exact tier: key = hash(normalized prompt, model parameters).
+Semantic tier (opt-in): among entries with the same model parameters, return
+the most similar cached prompt whose embedding clears ``similarity_threshold``.
+It only runs with an embedder, passed in or configured via
+``LLM_CACHE_EMBEDDER`` (see ``embedder_from_env``); ``LLM_CACHE_SEMANTIC=0``
+turns it off even then.
+
+Entries expire after ``ttl`` seconds and the least recently used entry is
+evicted once ``max_entries`` is reached. Lookups are counted in Prometheus.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import Counter, Gauge
+
+from .embeddings import cosine, embedder_from_env
+
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0.92"))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "1") not in {"0", "false", "False"}
+
+CACHE_LOOKUPS = Counter(
+    "llm_cache_lookups_total", "LLM cache lookups", ["namespace", "tier", "result"]
+)
+CACHE_ENTRIES = Gauge("llm_cache_entries", "LLM cache entries", ["namespace"])
+CACHE_EVICTIONS = Counter(
+    "llm_cache_evictions_total", "LLM cache evictions", ["namespace", "reason"]
+)
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WS_RE.sub(" ", prompt).strip().casefold()
+
+
+def params_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def cache_key(prompt: str, params: Dict[str, Any]) -> str:
+    raw = f"{params_key(params)}\x00{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+@dataclass
+class CacheHit:
+    value: Any
+    tier: str
+    similarity: float = 1.0
+
+
+@dataclass
+class _Entry:
+    value: Any
+    params: str
+    embedding: Optional[List[float]]
+    expires_at: float
+
+
+class LLMCache:
+    def __init__(
+        self,
+        namespace: str = "default",
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl: float = LLM_CACHE_TTL,
+        similarity_threshold: float = LLM_CACHE_SIMILARITY,
+        semantic: bool = LLM_CACHE_SEMANTIC,
+        embedder=None,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.embedder = (embedder or embedder_from_env()) if semantic else None
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"exact_hit": 0, "semantic_hit": 0, "miss": 0}
+
+    def _count(self, tier: str, result: str) -> None:
+        CACHE_LOOKUPS.labels(self.namespace, tier, result).inc()
+
+    def _expire(self, now: float) -> None:
+        expired = [k for k, e in self._entries.items() if e.expires_at <= now]
+        for k in expired:
+            del self._entries[k]
+        if expired:
+            CACHE_EVICTIONS.labels(self.namespace, "ttl").inc(len(expired))
+
+    def get(self, prompt: str, **params) -> Optional[CacheHit]:
+        key = cache_key(prompt, params)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._count("exact", "hit")
+                self._stats["exact_hit"] += 1
+                return CacheHit(entry.value, "exact")
+            self._count("exact", "miss")
+            pkey = params_key(params)
+            candidates = [(k, e) for k, e in self._entries.items() if e.params == pkey]
+        if self.embedder is None or not candidates:
+            self._record_miss()
+            return None
+
+        # Embed outside the lock; model embedders can take milliseconds
+        query = self.embedder.embed(normalize_prompt(prompt))
+        best_key, best_score = None, -1.0
+        for k, e in candidates:
+            score = cosine(query, e.embedding)
+            if score > best_score:
+                best_key, best_score = k, score
+        with self._lock:
+            entry = self._entries.get(best_key)
+            if entry is not None and best_score >= self.similarity_threshold:
+                self._entries.move_to_end(best_key)
+                self._count("semantic", "hit")
+                self._stats["semantic_hit"] += 1
+                return CacheHit(entry.value, "semantic", best_score)
+            self._count("semantic", "miss")
+        self._record_miss()
+        return None
+
+    def _record_miss(self) -> None:
+        with self._lock:
+            self._stats["miss"] += 1
+
+    def put(self, prompt: str, value: Any, **params) -> None:
+        embedding = self.embedder.embed(normalize_prompt(prompt)) if self.embedder else None
+        key = cache_key(prompt, params)
+        with self._lock:
+            self._entries[key] = _Entry(
+                value, params_key(params), embedding, time.monotonic() + self.ttl
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.labels(self.namespace, "lru").inc()
+            CACHE_ENTRIES.labels(self.namespace).set(len(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            CACHE_ENTRIES.labels(self.namespace).set(0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = sum(self._stats.values())
+            hits = self._stats["exact_hit"] + self._stats["semantic_hit"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,77 @@
+"""Prompt embedders for the semantic cache tier.
+
+All embedders return unit-length vectors so cosine similarity is a dot product.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import re
+from typing import List, Sequence
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _unit(vec: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vec))
+    return [v / norm for v in vec] if norm else list(vec)
+
+
+class HashingEmbedder:
+    """Dependency-free bag-of-words embedder (unigrams + bigrams, hashed into ``dim`` buckets).
+
+    Only for tests and experiments: prompts that differ in one key token ("top"
+    vs "bottom", a month) score well above any usable threshold, so it must
+    not back a production cache.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _bucket(self, feature: str) -> tuple[int, float]:
+        h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+        return h % self.dim, 1.0 if (h >> 63) & 1 else -1.0
+
+    def embed(self, text: str) -> List[float]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vec = [0.0] * self.dim
+        for feature in features:
+            idx, sign = self._bucket(feature)
+            vec[idx] += sign
+        return _unit(vec)
+
+
+class SentenceTransformerEmbedder:
+    """Wraps a sentence-transformers model (imported lazily)."""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def embed(self, text: str) -> List[float]:
+        return _unit(self.model.encode(text).tolist())
+
+
+def embedder_from_env():
+    """Build the embedder named by ``LLM_CACHE_EMBEDDER``, or None when unset.
+
+    ``sentence-transformers:<model name>``, or ``hashing`` for experiments.
+    Without one the cache has no semantic tier.
+    """
+    spec = os.getenv("LLM_CACHE_EMBEDDER", "")
+    if spec.startswith("sentence-transformers"):
+        _, _, model_name = spec.partition(":")
+        return SentenceTransformerEmbedder(model_name or "all-MiniLM-L6-v2")
+    if spec == "hashing":
+        return HashingEmbedder()
+    if spec:
+        raise ValueError(f"Unknown LLM_CACHE_EMBEDDER: {spec}")
+    return None
+
+
+def cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
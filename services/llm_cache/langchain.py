@@ -0,0 +1,24 @@
+"""LangChain adapter: ``set_llm_cache(LangChainCache(LLMCache(namespace="langchain")))``."""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from langchain_core.caches import BaseCache
+
+from .cache import LLMCache
+
+
+class LangChainCache(BaseCache):
+    def __init__(self, cache: LLMCache):
+        self.cache = cache
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Any]:
+        hit = self.cache.get(prompt, llm=llm_string)
+        return hit.value if hit else None
+
+    def update(self, prompt: str, llm_string: str, return_val: Any) -> None:
+        self.cache.put(prompt, return_val, llm=llm_string)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear()
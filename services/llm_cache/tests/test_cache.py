@@ -0,0 +1,61 @@
+from llm_cache import HashingEmbedder, LLMCache, cache_key
+
+
+def make_cache(**kwargs):
+    kwargs.setdefault("embedder", HashingEmbedder())
+    return LLMCache(namespace="test", **kwargs)
+
+
+def test_exact_hit_ignores_case_and_whitespace():
+    cache = make_cache()
+    cache.put("What is the top ROI product?", "widget", model="echo")
+    hit = cache.get("  what is the   top roi product? ", model="echo")
+    assert hit.value == "widget" and hit.tier == "exact"
+
+
+def test_model_params_partition_entries():
+    cache = make_cache()
+    cache.put("hello", "a", model="echo", temperature=0)
+    assert cache.get("hello", model="echo", temperature=1) is None
+    assert cache_key("hello", {"model": "x"}) != cache_key("hello", {"model": "y"})
+
+
+def test_semantic_hit_above_threshold():
+    cache = make_cache(similarity_threshold=0.7)
+    cache.put("which product has the top roi in retail", "widget", model="echo")
+    hit = cache.get("which product has the top roi in retail today", model="echo")
+    assert hit.tier == "semantic" and hit.value == "widget"
+    assert cache.get("summarize the logistics costs report", model="echo") is None
+
+
+def test_lru_eviction_and_ttl():
+    cache = make_cache(max_entries=2, semantic=False)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a").value == 1
+
+    expiring = make_cache(ttl=0, semantic=False)
+    expiring.put("a", 1)
+    assert expiring.get("a") is None
+
+
+def test_stats_hit_rate():
+    cache = make_cache(semantic=False)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    stats = cache.stats()
+    assert stats["exact_hit"] == 1 and stats["miss"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_semantic_tier_is_off_without_configured_embedder(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_EMBEDDER", raising=False)
+    cache = LLMCache(namespace="test")
+    assert cache.embedder is None
+    cache.put("return the top 5 products by ROI for March", "top five", model="echo")
+    assert cache.get("return the bottom 5 products by ROI for March", model="echo") is None
+    assert cache.get("return the top 5 products by ROI for April", model="echo") is None
@@ -0,0 +1,152 @@
+"""Model backends and admission control for the Ogem chat service.
+
+Each backend streams completion tokens as an async iterator. Backends are
+registered by name; a request's ``model`` selects one (falling back to the
+default). Every backend owns a semaphore capping in-flight generations, and
+callers wait for a slot in FIFO order up to a queue deadline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict
+
+import httpx
+
+OGEM_DEFAULT_BACKEND = os.getenv("OGEM_DEFAULT_BACKEND", "echo")
+OGEM_MAX_CONCURRENCY = int(os.getenv("OGEM_MAX_CONCURRENCY", "4"))
+OGEM_QUEUE_TIMEOUT = float(os.getenv("OGEM_QUEUE_TIMEOUT", "10"))
+OGEM_FAKE_TOKEN_DELAY = float(os.getenv("OGEM_FAKE_TOKEN_DELAY", "0.05"))
+# OpenAI-compatible upstream (e.g. the LiteLLM proxy); registered only when set
+OGEM_UPSTREAM_URL = os.getenv("OGEM_UPSTREAM_URL", "")
+OGEM_UPSTREAM_MODEL = os.getenv("OGEM_UPSTREAM_MODEL", "gpt-3.5-turbo")
+OGEM_UPSTREAM_API_KEY = os.getenv("OGEM_UPSTREAM_API_KEY", "")
+# Read timeout bounds the wait for each chunk, including the first token
+OGEM_UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("OGEM_UPSTREAM_CONNECT_TIMEOUT", "10"))
+OGEM_UPSTREAM_READ_TIMEOUT = float(os.getenv("OGEM_UPSTREAM_READ_TIMEOUT", "120"))
+
+
+class QueueTimeout(Exception):
+    """Raised when no backend slot frees up before the queue deadline."""
+
+
+class Lease:
+    """A held concurrency slot. ``release`` is idempotent."""
+
+    def __init__(self, semaphore: asyncio.Semaphore):
+        self._semaphore = semaphore
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._semaphore.release()
+
+
+class Backend(ABC):
+    """Base class: subclasses implement ``stream``."""
+
+    def __init__(self, name: str, max_concurrency: int = OGEM_MAX_CONCURRENCY):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self.max_concurrency - self._semaphore._value
+
+    async def acquire(self, timeout: float = OGEM_QUEUE_TIMEOUT) -> Lease:
+        """Wait for a free slot, raising ``QueueTimeout`` after ``timeout`` seconds."""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise QueueTimeout(f"backend {self.name} busy for {timeout:.1f}s")
+        finally:
+            self.waiting -= 1
+        return Lease(self._semaphore)
+
+    @abstractmethod
+    def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield completion tokens; closing the iterator must cancel the generation."""
+
+
+class FakeBackend(Backend):
+    """Local backend echoing the prompt word by word; used for dev and tests."""
+
+    def __init__(self, name: str = "echo", delay: float = OGEM_FAKE_TOKEN_DELAY, **kwargs):
+        super().__init__(name, **kwargs)
+        self.delay = delay
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        words = prompt.split(" ")
+        yield "echo:"
+        for word in words:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield f" {word}"
+
+
+class OpenAIBackend(Backend):
+    """Streams chat completions from an OpenAI-compatible ``/chat/completions`` API."""
+
+    def __init__(self, name: str, base_url: str, model: str, api_key: str = "", **kwargs):
+        super().__init__(name, **kwargs)
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True,
+        }
+        timeout = httpx.Timeout(OGEM_UPSTREAM_READ_TIMEOUT, connect=OGEM_UPSTREAM_CONNECT_TIMEOUT)
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            async with client.stream(
+                "POST", f"{self.base_url}/chat/completions", json=body, headers=headers
+            ) as r:
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:") :].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {})
+                    if delta.get("content"):
+                        yield delta["content"]
+
+
+_backends: Dict[str, Backend] = {}
+
+
+def register_backend(backend: Backend) -> None:
+    _backends[backend.name] = backend
+
+
+def get_backend(model: str | None = None) -> Backend:
+    """Route a model name to its backend, defaulting to ``OGEM_DEFAULT_BACKEND``."""
+    name = model or OGEM_DEFAULT_BACKEND
+    if name not in _backends:
+        raise KeyError(name)
+    return _backends[name]
+
+
+def list_backends() -> Dict[str, Backend]:
+    return dict(_backends)
+
+
+register_backend(FakeBackend())
+if OGEM_UPSTREAM_URL:
+    register_backend(
+        OpenAIBackend(
+            OGEM_UPSTREAM_MODEL, OGEM_UPSTREAM_URL, OGEM_UPSTREAM_MODEL, OGEM_UPSTREAM_API_KEY
+        )
+    )
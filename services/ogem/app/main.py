@@ -1,20 +1,149 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import json
 import os
 
+from llm_cache import LLMCache
+
+from .backends import QueueTimeout, get_backend, list_backends
+
 app = FastAPI(title="Ogem Service", version="0.1.0")
+# Lookups and puts embed the prompt and scan every entry on a semantic miss, so they
+# run in the threadpool rather than stalling the event loop (and open SSE streams)
+response_cache = LLMCache(namespace="ogem")
+# How often a non-streamed generation checks whether its client is still there
+DISCONNECT_POLL_INTERVAL = 0.5
+
 
 class ChatRequest(BaseModel):
     prompt: str
+    model: str | None = None
+    stream: bool = False
+
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
+
+@app.get("/backends")
+async def backends():
+    return {
+        name: {"in_flight": b.in_flight, "waiting": b.waiting, "max_concurrency": b.max_concurrency}
+        for name, b in list_backends().items()
+    }
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return response_cache.stats()
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_tokens(request: Request, backend, prompt: str, lease):
+    """Forward backend tokens as SSE events; stop as soon as the client goes away."""
+    tokens = backend.stream(prompt)
+    parts = []
+    try:
+        async for token in tokens:
+            if await request.is_disconnected():
+                break
+            parts.append(token)
+            yield _sse("token", {"token": token})
+        else:
+            # Only complete generations are cached
+            await run_in_threadpool(response_cache.put, prompt, "".join(parts), model=backend.name)
+            yield _sse("done", {})
+    except Exception as e:
+        yield _sse("error", {"detail": str(e)})
+    finally:
+        # Closing the generator cancels the upstream generation (and its HTTP stream)
+        try:
+            await tokens.aclose()
+        finally:
+            lease.release()
+
+
+async def _collect_tokens(request: Request, backend, prompt: str):
+    """Full generation as one string, or None if the client went away first.
+
+    Disconnects are polled next to the generation rather than between tokens,
+    so a client leaving while the upstream stalls still frees the slot.
+    """
+
+    async def collect():
+        tokens = backend.stream(prompt)
+        try:
+            return "".join([token async for token in tokens])
+        finally:
+            await tokens.aclose()
+
+    collection = asyncio.ensure_future(collect())
+    try:
+        while True:
+            done, _ = await asyncio.wait({collection}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return collection.result()
+            if await request.is_disconnected():
+                return None
+    finally:
+        # Cancelling closes the backend iterator and with it the upstream request
+        if not collection.done():
+            collection.cancel()
+            await asyncio.gather(collection, return_exceptions=True)
+
+
 @app.post("/chat")
-async def chat(req: ChatRequest):
-    # Placeholder echo logic; integrate model routing later
-    return {"response": f"echo: {req.prompt}"}
+async def chat(req: ChatRequest, request: Request):
+    try:
+        backend = get_backend(req.model)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {req.model}")
+
+    hit = await run_in_threadpool(response_cache.get, req.prompt, model=backend.name)
+    if hit is not None:
+        headers = {"X-Cache": hit.tier}
+        if req.stream:
+            body = _sse("token", {"token": hit.value}) + _sse("done", {})
+            return Response(body, media_type="text/event-stream", headers=headers)
+        return JSONResponse({"response": hit.value}, headers=headers)
+
+    try:
+        lease = await backend.acquire()
+    except QueueTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    if req.stream:
+        # The background task also releases the slot if the stream never started
+        return StreamingResponse(
+            _stream_tokens(request, backend, req.prompt, lease),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Cache": "miss"},
+            background=BackgroundTask(lease.release),
+        )
+    try:
+        response = await _collect_tokens(request, backend, req.prompt)
+    finally:
+        lease.release()
+    if response is None:
+        # 499 (client closed request): nobody reads it, but it shows up in access logs
+        return Response(status_code=499)
+    await run_in_threadpool(response_cache.put, req.prompt, response, model=backend.name)
+    return JSONResponse({"response": response}, headers={"X-Cache": "miss"})
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# The shared llm_cache package lives next to this service (copied into the image at build time)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
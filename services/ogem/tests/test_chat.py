@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from llm_cache import LLMCache
+
+from app import main
+from app.backends import FakeBackend, QueueTimeout, register_backend
+from app.main import app, response_cache
+
+register_backend(FakeBackend("echo", delay=0))
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    response_cache.clear()
+
+
+def test_chat_returns_full_response():
+    resp = client.post("/chat", json={"prompt": "hello world"})
+    assert resp.status_code == 200
+    assert resp.json()["response"] == "echo: hello world"
+
+
+def test_chat_streams_tokens_as_sse():
+    with client.stream("POST", "/chat", json={"prompt": "hello world", "stream": True}) as resp:
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        body = "".join(resp.iter_text())
+    events = [e for e in body.split("\n\n") if e]
+    assert events[0] == 'event: token\ndata: {"token": "echo:"}'
+    assert events[-1] == "event: done\ndata: {}"
+    assert len(events) == 4
+
+
+def test_chat_serves_repeat_prompts_from_cache():
+    first = client.post("/chat", json={"prompt": "top roi product"})
+    assert first.headers["x-cache"] == "miss"
+    again = client.post("/chat", json={"prompt": "Top  ROI product"})
+    assert again.headers["x-cache"] == "exact"
+    assert again.json() == first.json()
+    with client.stream("POST", "/chat", json={"prompt": "top roi product", "stream": True}) as r:
+        body = "".join(r.iter_text())
+    assert r.headers["x-cache"] == "exact"
+    assert '"token": "echo: top roi product"' in body
+
+
+def test_chat_unknown_model():
+    resp = client.post("/chat", json={"prompt": "hi", "model": "nope"})
+    assert resp.status_code == 404
+
+
+def test_backend_queue_deadline():
+    async def scenario():
+        backend = FakeBackend("busy", delay=0, max_concurrency=1)
+        lease = await backend.acquire()
+        with pytest.raises(QueueTimeout):
+            await backend.acquire(timeout=0.01)
+        lease.release()
+        lease.release()  # idempotent
+        again = await backend.acquire(timeout=0.01)
+        assert backend.in_flight == 1
+        again.release()
+        assert backend.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+class SlowEmbedder:
+    def embed(self, text):
+        time.sleep(0.2)
+        return [1.0, 0.0]
+
+
+def test_cache_lookups_do_not_block_the_event_loop(monkeypatch):
+    monkeypatch.setattr(main, "response_cache", LLMCache(namespace="slow", embedder=SlowEmbedder()))
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            task = asyncio.create_task(ticker())
+            await client.post("/chat", json={"prompt": "hello"})
+            task.cancel()
+        return ticks
+
+    # One embedding on put, none on the empty-cache lookup: ~0.2s the loop must stay live for
+    assert asyncio.run(scenario()) >= 5
+
+
+def test_non_stream_generation_stops_when_client_disconnects(monkeypatch):
+    monkeypatch.setattr(main, "DISCONNECT_POLL_INTERVAL", 0.01)
+
+    class Gone:
+        async def is_disconnected(self):
+            return True
+
+    closed = []
+
+    class Stalled(FakeBackend):
+        async def stream(self, prompt):
+            try:
+                await asyncio.Event().wait()  # upstream never sends a first token
+                yield "never"
+            finally:
+                closed.append(prompt)
+
+    backend = Stalled("stalled", delay=0)
+    result = asyncio.run(asyncio.wait_for(main._collect_tokens(Gone(), backend, "p"), 1))
+    assert result is None
+    assert closed == ["p"]
@@ -0,0 +1,135 @@
+"""Adaptive scheduler for Airbyte -> DuckDB syncs.
+
+Replaces fixed per-connection crons: deploy this flow on a short tick (see
+prefect.yaml) and give it the connections it manages. Each tick it loads the
+sync history, plans with ``flows.scheduling.plan_syncs`` and starts the sync
+deployment (``data-sync-deployment`` by default) for every connection whose
+planned start has arrived. Everything else waits for a later tick; the plan is
+recomputed from fresh history each time, so no state is carried between runs.
+
+A started run only writes history once its pod reaches the Airbyte trigger, so
+connections with a scheduled, pending or running flow run of the deployment are
+never started again until that run finishes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Set, Union
+
+from prefect import flow, get_client, get_run_logger, task
+from prefect.client.schemas.filters import (
+    DeploymentFilter,
+    DeploymentFilterId,
+    FlowRunFilter,
+    FlowRunFilterState,
+    FlowRunFilterStateType,
+)
+from prefect.client.schemas.objects import StateType
+from prefect.deployments import run_deployment
+
+from flows.scheduling import ConnectionSchedule, plan_syncs
+from flows.sync_history import load_history, utcnow
+from flows.tracing import end_flow_span, start_flow_span, traced
+
+SYNC_DEPLOYMENT = "data-sync-flow/data-sync-deployment"
+UNFINISHED_STATES = [StateType.SCHEDULED, StateType.PENDING, StateType.RUNNING]
+
+
+def _logger():
+    try:
+        return get_run_logger()
+    except Exception:
+        return logging.getLogger("prefect-fallback")
+
+
+def parse_schedules(connections: List[Union[str, Dict[str, Any]]]) -> List[ConnectionSchedule]:
+    """Connection ids use the default intervals; dicts may override them (seconds)."""
+    schedules = []
+    for conn in connections:
+        if isinstance(conn, str):
+            if conn:
+                schedules.append(ConnectionSchedule(conn))
+        else:
+            schedules.append(ConnectionSchedule(**conn))
+    return schedules
+
+
+@task
+@traced()
+async def unfinished_connections(deployment: str) -> Set[str]:
+    """Connection ids with a flow run of ``deployment`` that has not finished yet."""
+    async with get_client() as client:
+        target = await client.read_deployment_by_name(deployment)
+        runs = await client.read_flow_runs(
+            deployment_filter=DeploymentFilter(id=DeploymentFilterId(any_=[target.id])),
+            flow_run_filter=FlowRunFilter(
+                state=FlowRunFilterState(type=FlowRunFilterStateType(any_=UNFINISHED_STATES))
+            ),
+        )
+    return {run.parameters.get("connection_id") for run in runs}
+
+
+@task
+@traced()
+async def start_sync(deployment: str, connection_id: str, history_db: str) -> str:
+    # timeout=0: fire and forget; the sync flow records its own history
+    run = await run_deployment(
+        name=deployment,
+        parameters={"connection_id": connection_id, "history_db": history_db},
+        timeout=0,
+    )
+    _logger().info("Started sync for %s flow_run=%s", connection_id, run.id)
+    return str(run.id)
+
+
+@flow(name="adaptive-sync-scheduler")
+async def adaptive_sync_flow(
+    connections: List[Union[str, Dict[str, Any]]],
+    history_db: str = "/tmp/sync_history.duckdb",
+    deployment: str = SYNC_DEPLOYMENT,
+    long_sync_seconds: float = 900,
+    long_sync_slots: int = 1,
+) -> Dict[str, Any]:
+    """connections: Airbyte connection ids, or dicts with ``connection_id`` and optional
+    ``base_interval`` / ``max_interval`` / ``backoff`` overrides.
+    long_sync_seconds / long_sync_slots: syncs typically at least this long run at most
+    ``long_sync_slots`` at a time.
+    """
+    log = get_run_logger()
+    schedules = parse_schedules(connections)
+    span, span_token = start_flow_span("adaptive-sync-scheduler", connections=len(schedules))
+    try:
+        now = utcnow()
+        history = load_history(history_db, [s.connection_id for s in schedules])
+        plan = plan_syncs(schedules, history, now, long_sync_seconds, long_sync_slots)
+        # Started by an earlier tick but not (yet) visible in the history
+        unfinished = await unfinished_connections(deployment)
+        plan = [p for p in plan if p.connection_id not in unfinished]
+        due = [p for p in plan if p.start_at <= now]
+        for p in plan:
+            action = "start" if p.start_at <= now else f"wait until {p.start_at:%Y-%m-%d %H:%M}"
+            log.info(
+                "%s: %s (interval=%.0fs, ~%.0fs, %s)",
+                p.connection_id,
+                action,
+                p.interval,
+                p.expected_duration,
+                p.reason,
+            )
+        started = await asyncio.gather(
+            *(start_sync(deployment, p.connection_id, history_db) for p in due)
+        )
+        planned = {p.connection_id for p in plan}
+        return {
+            "started": dict(zip([p.connection_id for p in due], started)),
+            "deferred": {p.connection_id: p.start_at.isoformat() for p in plan if p.start_at > now},
+            "running": sorted({s.connection_id for s in schedules} - planned),
+        }
+    finally:
+        end_flow_span(span, span_token)
+
+
+if __name__ == "__main__":  # manual run demo
+    asyncio.run(adaptive_sync_flow(["dummy-connection-id"]))
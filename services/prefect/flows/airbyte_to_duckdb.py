@@ -14,13 +14,20 @@ from __future__ import annotations
 import asyncio
 import time
 import logging
-from typing import List, Dict, Any
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
 
 import httpx
 import duckdb
 from prefect import flow, task, get_run_logger
 from prometheus_client import Counter, Histogram, push_to_gateway
 
+from flows.caching import duckdb_task_cache_key, records_synced
+from flows.rollups import refresh_rollups
+from flows.snapshots import publish_snapshot
+from flows.sync_history import SyncRun, errored_run, finished_run, record_run, utcnow
+from flows.tracing import end_flow_span, start_flow_span, traced, tracer
+
 SYNC_COUNTER = Counter("airbyte_sync_total", "Total Airbyte sync executions")
 SYNC_DURATION = Histogram("airbyte_sync_duration_seconds", "Airbyte sync total duration")
 
@@ -33,6 +40,7 @@ def _logger():
 
 
 @task
+@traced()
 async def trigger_sync(connection_id: str, airbyte_url: str) -> str:
     log = _logger()
     async with httpx.AsyncClient(timeout=60) as client:
@@ -44,6 +52,7 @@ async def trigger_sync(connection_id: str, airbyte_url: str) -> str:
 
 
 @task
+@traced()
 async def wait_for_job(job_id: str, airbyte_url: str, max_wait: int = 1800) -> Dict[str, Any]:
     """Poll Airbyte job until terminal state with exponential backoff.
 
@@ -70,20 +79,68 @@ async def wait_for_job(job_id: str, airbyte_url: str, max_wait: int = 1800) -> D
             delay = min(delay * 2, 60)  # cap backoff
 
 
-@task
-def run_duckdb_sql(db_path: str, sql_statements: List[str]) -> None:
+@task(cache_key_fn=duckdb_task_cache_key, persist_result=True)
+@traced()
+def run_duckdb_sql(
+    db_path: str,
+    sql_statements: List[str],
+    records_synced: Optional[int] = None,
+    job_id: Optional[str] = None,
+    snapshot_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Execute statements; cached on SQL + source fingerprints + synced records.
+
+    On a cache hit Prefect skips the run and returns the previous metadata.
+    With snapshot_dir set, statements run against a staging copy that is then
+    published as the new current snapshot (db_path is ignored).
+    ROI rollups (flows.rollups) are refreshed in the same connection afterwards.
+    """
     log = _logger()
-    con = duckdb.connect(db_path)
-    try:
+    rollups: Dict[str, str] = {}
+
+    def build(con):
         for sql in sql_statements:
             log.info("Executing DuckDB SQL: %s", sql.split("\n")[0][:120])
-            con.execute(sql)
-    finally:
-        con.close()
+            with tracer.start_as_current_span("duckdb.execute", attributes={"db.statement": sql}):
+                con.execute(sql)
+        with tracer.start_as_current_span("duckdb.refresh_rollups"):
+            rollups.update(refresh_rollups(con))
+
+    snapshot = None
+    if snapshot_dir:
+        with tracer.start_as_current_span("duckdb.publish_snapshot"):
+            snapshot = publish_snapshot(snapshot_dir, build)
+        log.info("Published DuckDB snapshot %s", snapshot)
+    else:
+        with tracer.start_as_current_span("duckdb.connect", attributes={"duckdb.path": db_path}):
+            con = duckdb.connect(db_path)
+        try:
+            build(con)
+        finally:
+            con.close()
     log.info("DuckDB statements executed count=%d", len(sql_statements))
+    return {
+        "statements": len(sql_statements),
+        "snapshot": snapshot,
+        "rollups": rollups,
+        "job_id": job_id,
+        "records_synced": records_synced,
+        "executed_at": datetime.now(timezone.utc).isoformat(),
+    }
 
 
 @task
+@traced()
+def record_sync_run(history_db: str, run: SyncRun) -> None:
+    """Write the run to the sync history; a history failure never fails the sync."""
+    try:
+        record_run(history_db, run)
+    except Exception as e:
+        _logger().error("Sync history write failed: %s", e)
+
+
+@task
+@traced()
 def push_metrics(gateway_url: str, job_name: str, status: str, duration: float) -> None:
     log = _logger()
     SYNC_COUNTER.inc()
@@ -102,31 +159,57 @@ async def airbyte_to_duckdb_flow(
     duckdb_path: str = "/tmp/airbyte.duckdb",
     sql: List[str] | None = None,
     prometheus_gateway: str = "http://prometheus-pushgateway:9091",
-    job_name: str = "airbyte-to-duckdb"
+    job_name: str = "airbyte-to-duckdb",
+    refresh_cache: bool = False,
+    snapshot_dir: str | None = None,
+    history_db: str | None = "/tmp/sync_history.duckdb",
 ) -> Dict[str, Any]:
+    """refresh_cache: re-run the DuckDB statements even if their inputs are unchanged.
+    snapshot_dir: publish into snapshot-isolated files (see flows.snapshots) instead of
+    writing duckdb_path in place.
+    history_db: DuckDB file for the per-connection sync history (flows.sync_history)
+    that the adaptive scheduler plans from; None disables recording.
+    """
     log = get_run_logger()
     start = time.time()
     sql = sql or [
         "CREATE TABLE IF NOT EXISTS raw_sync_log(job_id VARCHAR, loaded_at TIMESTAMP DEFAULT now());"
     ]
+    span, span_token = start_flow_span("airbyte-to-duckdb", connection_id=connection_id)
+    job_id = job_data = None
+    triggered_at = utcnow()
     try:
         job_id = await trigger_sync(connection_id, airbyte_url)
+        if history_db:
+            record_sync_run(history_db, SyncRun(connection_id, str(job_id), triggered_at))
         job_data = await wait_for_job(job_id, airbyte_url)
+        if history_db:
+            finished = finished_run(connection_id, job_id, triggered_at, job_data)
+            record_sync_run(history_db, finished)
         job_status = job_data["job"]["status"].lower()
+        transform = None
         if job_status == "succeeded":
-            run_duckdb_sql(duckdb_path, sql)
+            transform = run_duckdb_sql.with_options(refresh_cache=refresh_cache)(
+                duckdb_path, sql, records_synced(job_data), job_id, snapshot_dir
+            )
             status = "success"
         else:
             status = job_status
             log.warning("Airbyte job finished with status=%s", job_status)
         duration = time.time() - start
         push_metrics(prometheus_gateway, job_name, status, duration)
-        return {"status": status, "duration": duration, "job_id": job_id}
+        return {"status": status, "duration": duration, "job_id": job_id, "transform": transform}
     except Exception as e:
         duration = time.time() - start
+        # A failure after the job finished (e.g. in the transform) keeps the recorded outcome
+        if history_db and job_id is not None and job_data is None:
+            record_sync_run(history_db, errored_run(connection_id, job_id, triggered_at))
         push_metrics(prometheus_gateway, job_name, "error", duration)
         log.error("Flow error: %s", e)
+        span.record_exception(e)
         raise
+    finally:
+        end_flow_span(span, span_token)
 
 
 if __name__ == "__main__":  # manual run demo
@@ -0,0 +1,115 @@
+"""Input-hash cache keys for DuckDB transform tasks.
+
+A transform only needs to re-run when one of its inputs changed:
+ - the SQL text itself
+ - the files it reads (``read_csv_auto('...')``, ``read_parquet('...')``, ...),
+   fingerprinted by size + mtime
+ - the data Airbyte delivered: if the sync moved zero records the destination is
+   unchanged, otherwise the key is tied to that job so every real load re-runs
+ - the target itself (db file or snapshot dir identity), so a deleted or
+   recreated target (e.g. a fresh pod's /tmp) is rebuilt instead of left empty
+
+Used as a Prefect ``cache_key_fn``; pass ``refresh_cache=True`` to force a rebuild.
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import os
+import re
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from flows.snapshots import read_current
+
+_SOURCE_RE = re.compile(r"read_\w+\(\s*'([^']+)'", re.IGNORECASE)
+
+
+def last_attempt(job_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The last attempt of an Airbyte job response (empty if it has none)."""
+    attempts = job_data.get("attempts") or []
+    if not attempts:
+        return {}
+    return attempts[-1].get("attempt", attempts[-1])
+
+
+def records_synced(job_data: Dict[str, Any]) -> Optional[int]:
+    """Records moved by the last attempt of an Airbyte job, or None if not reported."""
+    attempt = last_attempt(job_data)
+    if "recordsSynced" in attempt:
+        return int(attempt["recordsSynced"])
+    stats = attempt.get("totalStats") or {}
+    if "recordsCommitted" in stats:
+        return int(stats["recordsCommitted"])
+    return None
+
+
+def source_fingerprints(sql_statements: Iterable[str]) -> Dict[str, str]:
+    """Map every file path (or glob) read by the SQL to a ``size:mtime_ns`` fingerprint."""
+    fingerprints: Dict[str, str] = {}
+    for sql in sql_statements:
+        for pattern in _SOURCE_RE.findall(sql):
+            paths = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+            for path in paths:
+                try:
+                    st = os.stat(path)
+                    fingerprints[path] = f"{st.st_size}:{st.st_mtime_ns}"
+                except OSError:
+                    # Remote (s3://, http://) or not-yet-existing source: key on the path only
+                    fingerprints[path] = "unknown"
+    return fingerprints
+
+
+def target_identity(path: str) -> str:
+    """Device + inode of the output db file or snapshot dir ("missing" if absent).
+
+    Stable while the target is updated in place (snapshot publishes swap files
+    inside the dir) but different once it is deleted or recreated.
+    """
+    if path == ":memory:":
+        # A fresh database every run: never reuse a previous result
+        return f"memory:{uuid.uuid4()}"
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    identity = f"{st.st_dev}:{st.st_ino}"
+    if os.path.isdir(path):
+        current = read_current(path)
+        identity += ":published" if current and os.path.exists(current) else ":empty"
+    return identity
+
+
+def duckdb_input_key(
+    db_path: str,
+    sql_statements: List[str],
+    records: Optional[int] = None,
+    job_id: Optional[str] = None,
+) -> str:
+    if records == 0:
+        data_version = "no-new-records"
+    else:
+        # Unknown record counts are treated as changed data
+        data_version = f"job:{job_id}"
+    payload = {
+        "db_path": db_path,
+        "target": target_identity(db_path),
+        "sql": sql_statements,
+        "sources": source_fingerprints(sql_statements),
+        "data_version": data_version,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def duckdb_task_cache_key(context, parameters: Dict[str, Any]) -> str:
+    """Prefect ``cache_key_fn`` for ``run_duckdb_sql`` / ``run_duckdb_import``."""
+    sql = parameters.get("sql_statements", parameters.get("sql_script"))
+    sql_statements = [sql] if isinstance(sql, str) else list(sql)
+    return duckdb_input_key(
+        parameters.get("snapshot_dir") or parameters["db_path"],
+        sql_statements,
+        parameters.get("records_synced"),
+        parameters.get("job_id"),
+    )
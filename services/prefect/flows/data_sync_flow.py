@@ -1,7 +1,8 @@
 import asyncio
 import time
 import logging
-from typing import Dict, Any
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
 import httpx
 import duckdb
 from prefect import flow, task, get_run_logger
@@ -10,6 +11,11 @@ import great_expectations as ge
 from great_expectations.checkpoint import CheckpointResult
 import json
 
+from flows.caching import duckdb_task_cache_key, records_synced
+from flows.rollups import refresh_rollups
+from flows.snapshots import publish_snapshot
+from flows.sync_history import SyncRun, errored_run, finished_run, record_run, utcnow
+
 
 # Prometheus metrics
 sync_counter = Counter('airbyte_syncs_total', 'Total Airbyte syncs')
@@ -60,15 +66,42 @@ async def wait_for_sync_completion(job_id: str, airbyte_url: str) -> Dict[str, A
             await asyncio.sleep(10)
 
 
-@task
-def run_duckdb_import(db_path: str, sql_script: str) -> None:
-    """Run DuckDB import script"""
+@task(cache_key_fn=duckdb_task_cache_key, persist_result=True)
+def run_duckdb_import(
+    db_path: str,
+    sql_script: str,
+    records_synced: Optional[int] = None,
+    job_id: Optional[str] = None,
+    snapshot_dir: Optional[str] = None,
+    rollups: bool = False,
+) -> Dict[str, Any]:
+    """Run DuckDB import script (skipped via cache when its inputs are unchanged).
+    With snapshot_dir set, the script runs against a staging copy published as a new snapshot.
+    With rollups set, ROI rollups are refreshed after the import."""
     logger = _logger()
+    refreshed = {}
+
+    def build(conn):
+        conn.execute(sql_script)
+        if rollups:
+            refreshed.update(refresh_rollups(conn))
     
-    conn = duckdb.connect(db_path)
-    conn.execute(sql_script)
+    snapshot = None
+    if snapshot_dir:
+        snapshot = publish_snapshot(snapshot_dir, build)
+        logger.info(f"Published DuckDB snapshot {snapshot}")
+    else:
+        conn = duckdb.connect(db_path)
+        build(conn)
+        conn.close()
     logger.info("DuckDB import completed")
-    conn.close()
+    return {
+        "snapshot": snapshot,
+        "rollups": refreshed,
+        "job_id": job_id,
+        "records_synced": records_synced,
+        "executed_at": datetime.now(timezone.utc).isoformat(),
+    }
 
 
 @task
@@ -83,6 +116,15 @@ def push_metrics(gateway_url: str, job_name: str, sync_status: str, duration: fl
     logger.info(f"Pushed metrics: status={sync_status}, duration={duration}s")
 
 
+@task
+def record_sync_run(history_db: str, run: SyncRun) -> None:
+    """Write the run to the sync history; a history failure never fails the sync."""
+    try:
+        record_run(history_db, run)
+    except Exception as e:
+        _logger().error(f"Sync history write failed: {e}")
+
+
 @task
 def run_ge_validation(ge_root: str = "/app/services/great_expectations/great_expectations") -> dict:
     """Run Great Expectations checkpoint for orders and return summary dict.
@@ -109,22 +151,35 @@ async def data_sync_flow(
     db_path: str = "/tmp/data.db",
     sql_script: str = "CREATE TABLE IF NOT EXISTS synced_data AS SELECT * FROM read_csv_auto('/tmp/data.csv');",
     prometheus_gateway: str = "http://prometheus-pushgateway:9091",
-    job_name: str = "data-sync"
+    job_name: str = "data-sync",
+    refresh_cache: bool = False,
+    snapshot_dir: Optional[str] = None,
+    history_db: Optional[str] = None
 ) -> Dict[str, Any]:
-    """Main data synchronization flow"""
+    """Main data synchronization flow (refresh_cache forces the DuckDB import to re-run).
+    history_db: sync history file the adaptive scheduler plans from (flows.sync_history)."""
     logger = get_run_logger()
     start_time = time.time()
+    job_id = job_result = None
+    triggered_at = utcnow()
     
     try:
         # Trigger Airbyte sync
         job_id = await trigger_airbyte_sync(connection_id, airbyte_url)
+        if history_db:
+            record_sync_run(history_db, SyncRun(connection_id, str(job_id), triggered_at))
 
         # Wait for completion
         job_result = await wait_for_sync_completion(job_id, airbyte_url)
+        if history_db:
+            finished = finished_run(connection_id, job_id, triggered_at, job_result)
+            record_sync_run(history_db, finished)
 
         # Run DuckDB import if sync succeeded
         if job_result["job"]["status"] == "succeeded":
-            run_duckdb_import(db_path, sql_script)
+            run_duckdb_import.with_options(refresh_cache=refresh_cache)(
+                db_path, sql_script, records_synced(job_result), job_id, snapshot_dir, rollups=True
+            )
             status = "success"
         else:
             status = "failed"
@@ -143,6 +198,8 @@ async def data_sync_flow(
     except Exception as e:
         logger.error(f"Flow failed: {e}")
         duration = time.time() - start_time
+        if history_db and job_id is not None and job_result is None:
+            record_sync_run(history_db, errored_run(connection_id, job_id, triggered_at))
         push_metrics(prometheus_gateway, job_name, "error", duration)
         raise
 
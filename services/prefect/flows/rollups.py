@@ -0,0 +1,182 @@
+"""Incrementally maintained ROI rollups.
+
+Base tables (as loaded by the flows / ai_sql):
+ - ``products``            product_id, roi, revenue, cost [, loaded_at]
+ - ``product_categories``  product_id, description, category
+
+Every rollup stores additive measures so coarser groupings and averages can be
+derived from it: ``n`` (row count), ``n_roi`` (non-NULL roi count, the divisor
+for avg(roi)), ``sum_roi``, ``sum_revenue``, ``sum_cost``. Rows without a
+``loaded_at`` are left out of time-grained rollups (day cannot be NULL in a key).
+``rollup_catalog`` records each rollup's dimensions plus the refresh
+watermark; the gateway reads it to rewrite matching ai-sql queries.
+
+Refresh is incremental when ``products`` has a ``loaded_at`` column, the rollup
+table has the current columns, and the rows at or before the previous
+watermark plus any rows with a NULL ``loaded_at`` are unchanged (same count +
+row-hash checksum), and so is ``product_categories``: only newer rows are
+aggregated and merged with an upsert. Otherwise the rollup is rebuilt.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import duckdb
+
+BASE_TABLE = "products"
+CATEGORY_TABLE = "product_categories"
+CATALOG_TABLE = "rollup_catalog"
+
+DIMENSIONS: Dict[str, Tuple[str, str]] = {
+    # name -> (select expression, column type)
+    "category": ("coalesce(c.category, 'unknown')", "VARCHAR"),
+    "day": ("date_trunc('day', m.loaded_at)", "TIMESTAMP"),
+}
+MEASURES: Dict[str, Tuple[str, str]] = {
+    # name -> (aggregate expression, column type)
+    "n": ("count(*)", "BIGINT"),
+    "n_roi": ("count(m.roi)", "BIGINT"),
+    "sum_roi": ("sum(m.roi)", "DOUBLE"),
+    "sum_revenue": ("sum(m.revenue)", "DOUBLE"),
+    "sum_cost": ("sum(m.cost)", "DOUBLE"),
+}
+
+
+@dataclass(frozen=True)
+class Rollup:
+    name: str
+    dimensions: Tuple[str, ...]
+
+    @property
+    def needs_time(self) -> bool:
+        return "day" in self.dimensions
+
+
+ROLLUPS: List[Rollup] = [
+    Rollup("rollup_roi_by_category", ("category",)),
+    Rollup("rollup_roi_by_day_category", ("day", "category")),
+]
+
+
+def _tables(con) -> set:
+    return {row[0] for row in con.execute("SHOW TABLES").fetchall()}
+
+
+def _has_loaded_at(con) -> bool:
+    cols = con.execute(f"DESCRIBE {BASE_TABLE}").fetchall()
+    return any(col[0] == "loaded_at" for col in cols)
+
+
+def _aggregate_sql(rollup: Rollup, condition: str = "") -> str:
+    dims = ", ".join(f"{DIMENSIONS[d][0]} AS {d}" for d in rollup.dimensions)
+    measures = ", ".join(f"{expr} AS {name}" for name, (expr, _) in MEASURES.items())
+    conditions = [condition] if condition else []
+    if rollup.needs_time:
+        conditions.append("m.loaded_at IS NOT NULL")
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    return (
+        f"SELECT {dims}, {measures} "
+        f"FROM {BASE_TABLE} m LEFT JOIN {CATEGORY_TABLE} c ON m.product_id = c.product_id "
+        f"{where}GROUP BY {', '.join(rollup.dimensions)}"
+    )
+
+
+def _columns(rollup: Rollup) -> List[str]:
+    columns = [f"{d} {DIMENSIONS[d][1]}" for d in rollup.dimensions]
+    return columns + [f"{name} {type_}" for name, (_, type_) in MEASURES.items()]
+
+
+def _ensure_catalog(con) -> None:
+    con.execute(
+        f"CREATE TABLE IF NOT EXISTS {CATALOG_TABLE}("
+        "name VARCHAR PRIMARY KEY, dimensions VARCHAR, watermark TIMESTAMP, "
+        "base_checksum VARCHAR, refreshed_at TIMESTAMP)"
+    )
+
+
+# Rows a merge after ``watermark`` would not pick up: any change here forces a rebuild
+_SETTLED_ROWS = "WHERE loaded_at <= ? OR loaded_at IS NULL"
+
+
+def _checksum(con, watermark) -> str:
+    """Fingerprint of the settled ``products`` rows and of ``product_categories``.
+
+    A re-categorised product changes every rollup row of that product, so any
+    category change forces a rebuild too.
+    """
+    count, total = con.execute(
+        f"SELECT count(*), coalesce(sum(hash(product_id, roi, revenue, cost, loaded_at)), 0) "
+        f"FROM {BASE_TABLE} {_SETTLED_ROWS}",
+        [watermark],
+    ).fetchone()
+    categories, category_total = con.execute(
+        f"SELECT count(*), coalesce(sum(hash(product_id, category)), 0) FROM {CATEGORY_TABLE}"
+    ).fetchone()
+    return f"{count}:{total}/{categories}:{category_total}"
+
+
+def _current_schema(con, rollup: Rollup) -> bool:
+    """Whether the rollup table exists with today's columns (older ones lack n_roi)."""
+    if rollup.name not in _tables(con):
+        return False
+    existing = [col[0] for col in con.execute(f"DESCRIBE {rollup.name}").fetchall()]
+    return existing == [column.split()[0] for column in _columns(rollup)]
+
+
+def _rebuild(con, rollup: Rollup) -> None:
+    con.execute(
+        f"CREATE OR REPLACE TABLE {rollup.name}("
+        f"{', '.join(_columns(rollup))}, PRIMARY KEY ({', '.join(rollup.dimensions)}))"
+    )
+    con.execute(f"INSERT INTO {rollup.name} {_aggregate_sql(rollup)}")
+
+
+def _merge(con, rollup: Rollup, watermark) -> None:
+    updates = ", ".join(f"{name} = {name} + excluded.{name}" for name in MEASURES)
+    con.execute(
+        f"INSERT INTO {rollup.name} {_aggregate_sql(rollup, 'm.loaded_at > ?')} "
+        f"ON CONFLICT ({', '.join(rollup.dimensions)}) DO UPDATE SET {updates}",
+        [watermark],
+    )
+
+
+def refresh_rollup(con: duckdb.DuckDBPyConnection, rollup: Rollup, has_time: bool) -> str:
+    """Refresh one rollup; returns "incremental", "full" or "skipped"."""
+    if rollup.needs_time and not has_time:
+        con.execute(f"DELETE FROM {CATALOG_TABLE} WHERE name = ?", [rollup.name])
+        return "skipped"
+    state = con.execute(
+        f"SELECT watermark, base_checksum FROM {CATALOG_TABLE} WHERE name = ?", [rollup.name]
+    ).fetchone()
+    mode = "full"
+    if has_time and state is not None and state[0] is not None:
+        unchanged = _checksum(con, state[0]) == state[1]
+        if unchanged and _current_schema(con, rollup):
+            mode = "incremental"
+    if mode == "incremental":
+        _merge(con, rollup, state[0])
+    else:
+        _rebuild(con, rollup)
+
+    watermark, checksum = None, None
+    if has_time:
+        watermark = con.execute(f"SELECT max(loaded_at) FROM {BASE_TABLE}").fetchone()[0]
+        checksum = _checksum(con, watermark)
+    con.execute(
+        f"INSERT OR REPLACE INTO {CATALOG_TABLE} VALUES (?, ?, ?, ?, now())",
+        [rollup.name, ",".join(rollup.dimensions), watermark, checksum],
+    )
+    return mode
+
+
+def refresh_rollups(
+    con: duckdb.DuckDBPyConnection, rollups: Optional[List[Rollup]] = None
+) -> Dict[str, str]:
+    """Refresh all rollups whose base tables exist; no-op before products are loaded."""
+    if not {BASE_TABLE, CATEGORY_TABLE} <= _tables(con):
+        return {}
+    _ensure_catalog(con)
+    has_time = _has_loaded_at(con)
+    return {r.name: refresh_rollup(con, r, has_time) for r in rollups or ROLLUPS}
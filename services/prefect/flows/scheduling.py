@@ -0,0 +1,128 @@
+"""Adaptive sync planning from ``sync_history`` (see flows.sync_history).
+
+Each connection has a base interval (what its fixed cron used to be) and a
+``max_interval`` staleness bound. The interval doubles (``backoff``) for every
+consecutive successful sync that moved no records, up to ``max_interval``, and
+drops back to the base as soon as a sync delivers data or fails. Connections
+that rarely change are therefore polled less often, while ones that keep
+changing keep their old cadence. The trade-off: data that lands after an idle
+spell can be up to ``max_interval`` stale instead of ``base_interval``.
+
+Syncs whose typical duration is at least ``long_sync_seconds`` share
+``long_sync_slots`` lanes: a long sync that is due while another long sync is
+(expected to be) running is pushed back until that lane frees up, so heavy
+syncs do not pile onto the Airbyte workers at once.
+
+``plan_syncs`` is pure: history and ``now`` in, a plan out.
+"""
+
+from __future__ import annotations
+
+import statistics
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from flows.sync_history import RUNNING, SyncRun
+
+DEFAULT_DURATION = 300.0
+
+
+@dataclass(frozen=True)
+class ConnectionSchedule:
+    connection_id: str
+    base_interval: float = 3600.0
+    max_interval: float = 6 * 3600.0
+    backoff: float = 2.0
+
+
+@dataclass(frozen=True)
+class PlannedSync:
+    connection_id: str
+    due_at: datetime
+    start_at: datetime
+    interval: float
+    expected_duration: float
+    reason: str
+
+
+def idle_streak(runs: Sequence[SyncRun]) -> int:
+    """Consecutive most recent successful syncs that moved zero records."""
+    streak = 0
+    for run in runs:
+        if run.status == RUNNING:
+            continue
+        # Unknown record counts count as changed data, as in flows.caching
+        if run.status != "succeeded" or run.records != 0:
+            break
+        streak += 1
+    return streak
+
+
+def expected_duration(runs: Sequence[SyncRun]) -> float:
+    durations = [r.duration for r in runs if r.status == "succeeded" and r.duration is not None]
+    return statistics.median(durations) if durations else DEFAULT_DURATION
+
+
+def next_interval(schedule: ConnectionSchedule, runs: Sequence[SyncRun]) -> float:
+    interval = schedule.base_interval * schedule.backoff ** idle_streak(runs)
+    return min(interval, max(schedule.max_interval, schedule.base_interval))
+
+
+def _in_flight(runs: Sequence[SyncRun], now: datetime, duration: float) -> Optional[SyncRun]:
+    """The newest run if it is still running; runs far past their expected end are
+    treated as abandoned (e.g. the flow crashed before recording the outcome)."""
+    if not runs or runs[0].status != RUNNING:
+        return None
+    abandon_after = timedelta(seconds=max(3 * duration, 3600))
+    return runs[0] if now - runs[0].started_at < abandon_after else None
+
+
+def plan_syncs(
+    schedules: Sequence[ConnectionSchedule],
+    history: Dict[str, List[SyncRun]],
+    now: datetime,
+    long_sync_seconds: float = 900.0,
+    long_sync_slots: int = 1,
+) -> List[PlannedSync]:
+    """Next sync per connection (newest-first ``history``), ordered by start time.
+
+    Connections with a sync in flight are left out. Callers trigger the entries
+    whose ``start_at`` is not after ``now`` and re-plan on their next tick.
+    """
+    lanes = [now] * max(long_sync_slots, 1)
+    pending = []
+    for schedule in schedules:
+        runs = history.get(schedule.connection_id, [])
+        duration = expected_duration(runs)
+        running = _in_flight(runs, now, duration)
+        if running is not None:
+            if duration >= long_sync_seconds:
+                lane = lanes.index(min(lanes))
+                lanes[lane] = max(lanes[lane], running.started_at + timedelta(seconds=duration))
+            continue
+        interval = next_interval(schedule, runs)
+        finished = [r for r in runs if r.status != RUNNING]
+        if not finished:
+            due_at, reason = now, "no history"
+        else:
+            due_at = finished[0].started_at + timedelta(seconds=interval)
+            if finished[0].status != "succeeded":
+                reason = f"retry after {finished[0].status}"
+            elif interval > schedule.base_interval:
+                reason = f"stretched: {idle_streak(runs)} idle syncs"
+            else:
+                reason = "base interval"
+        pending.append((due_at, schedule.connection_id, interval, duration, reason))
+
+    plan = []
+    # Most overdue first, so lanes go to the stalest long syncs
+    for due_at, connection_id, interval, duration, reason in sorted(pending):
+        start_at = max(due_at, now)
+        if duration >= long_sync_seconds:
+            lane = lanes.index(min(lanes))
+            if lanes[lane] > start_at:
+                start_at, reason = lanes[lane], f"{reason}; staggered behind a long sync"
+            lanes[lane] = start_at + timedelta(seconds=duration)
+        plan.append(PlannedSync(connection_id, due_at, start_at, interval, duration, reason))
+    return sorted(plan, key=lambda p: (p.start_at, p.connection_id))
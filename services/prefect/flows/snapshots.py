@@ -0,0 +1,104 @@
+"""Snapshot publishing for DuckDB databases read by the gateway.
+
+Layout of ``snapshot_dir``::
+
+    snapshot-<version>.duckdb   immutable, fully checkpointed snapshots
+    CURRENT                     file name of the snapshot readers should open
+
+A publish copies the current snapshot into a staging file, runs the build
+against the copy, checkpoints it, renames it into place and atomically swaps
+``CURRENT`` (write temp file + ``os.replace``). Readers only ever open
+published files read-only, so loads never contend with queries for DuckDB's
+file lock. Older snapshots beyond ``retain`` are deleted; readers that still
+hold them open keep working until they close (POSIX unlink semantics).
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+import duckdb
+
+CURRENT_POINTER = "CURRENT"
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".duckdb"
+
+
+def read_current(snapshot_dir: str) -> Optional[str]:
+    """Absolute path of the current snapshot, or None if nothing was published yet."""
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_POINTER)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(snapshot_dir, name) if name else None
+
+
+def list_snapshots(snapshot_dir: str) -> List[str]:
+    names = [
+        n
+        for n in os.listdir(snapshot_dir)
+        if n.startswith(SNAPSHOT_PREFIX) and n.endswith(SNAPSHOT_SUFFIX)
+    ]
+    return sorted(names)
+
+
+@contextmanager
+def _publish_lock(snapshot_dir: str):
+    # Serializes publishers; readers never take this lock
+    with open(os.path.join(snapshot_dir, ".publish.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _swap_pointer(snapshot_dir: str, name: str) -> None:
+    tmp = os.path.join(snapshot_dir, f".{CURRENT_POINTER}.tmp")
+    with open(tmp, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(snapshot_dir, CURRENT_POINTER))
+
+
+def publish_snapshot(
+    snapshot_dir: str,
+    build: Callable[[duckdb.DuckDBPyConnection], None],
+    retain: int = 3,
+) -> str:
+    """Build a new snapshot from the current one and make it current. Returns its path."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with _publish_lock(snapshot_dir):
+        now = time.time_ns()
+        version = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now // 10**9)) + f"{now % 10**9:09d}"
+        name = f"{SNAPSHOT_PREFIX}{version}{SNAPSHOT_SUFFIX}"
+        staging = os.path.join(snapshot_dir, f".staging-{name}")
+        current = read_current(snapshot_dir)
+        if current and os.path.exists(current):
+            shutil.copyfile(current, staging)
+        try:
+            con = duckdb.connect(staging)
+            try:
+                build(con)
+                con.execute("CHECKPOINT")
+            finally:
+                con.close()
+            final = os.path.join(snapshot_dir, name)
+            os.replace(staging, final)
+        except BaseException:
+            for leftover in (staging, staging + ".wal"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            raise
+        _swap_pointer(snapshot_dir, name)
+        for old in list_snapshots(snapshot_dir)[:-retain] if retain > 0 else []:
+            if old != name:
+                os.remove(os.path.join(snapshot_dir, old))
+    return final
@@ -0,0 +1,161 @@
+"""Per-connection Airbyte sync history kept in DuckDB.
+
+One ``sync_history`` row per Airbyte job: connection, timings, records and
+bytes moved, and outcome. ``airbyte_to_duckdb_flow`` inserts the row as
+``running`` when it triggers a sync and completes it once the job reaches a
+terminal state; ``flows.scheduling`` plans the next syncs from it.
+
+The history lives in its own database file (not the analytics DB or its
+snapshots) so the gateway never sees it and writes stay tiny. DuckDB allows a
+single process per writable file, so access is serialised on a sidecar ``.lock``.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import duckdb
+
+from flows.caching import last_attempt, records_synced
+
+HISTORY_TABLE = "sync_history"
+RUNNING = "running"
+
+
+@dataclass(frozen=True)
+class SyncRun:
+    connection_id: str
+    job_id: str
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration: Optional[float] = None
+    records: Optional[int] = None
+    bytes: Optional[int] = None
+    status: str = RUNNING
+
+
+def utcnow() -> datetime:
+    # Stored as naive UTC TIMESTAMPs, like the rest of the DuckDB tables
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def bytes_synced(job_data: Dict[str, Any]) -> Optional[int]:
+    """Bytes moved by the last attempt of an Airbyte job, or None if not reported."""
+    attempt = last_attempt(job_data)
+    if "bytesSynced" in attempt:
+        return int(attempt["bytesSynced"])
+    stats = attempt.get("totalStats") or {}
+    if "bytesCommitted" in stats:
+        return int(stats["bytesCommitted"])
+    return None
+
+
+def job_window(job_data: Dict[str, Any]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """(started_at, finished_at) from Airbyte's epoch-second job timestamps, None if absent."""
+    job = job_data.get("job") or {}
+
+    def ts(key):
+        value = job.get(key)
+        return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None) if value else None
+
+    return ts("createdAt"), ts("updatedAt")
+
+
+def finished_run(
+    connection_id: str, job_id: str, started_at: datetime, job_data: Dict[str, Any]
+) -> SyncRun:
+    """History row for a job that reached a terminal state (or timed out waiting)."""
+    job_started, job_finished = job_window(job_data)
+    started_at = job_started or started_at
+    finished_at = job_finished or utcnow()
+    status = "timed_out" if job_data.get("timed_out") else job_data["job"]["status"].lower()
+    return SyncRun(
+        connection_id=connection_id,
+        job_id=str(job_id),
+        started_at=started_at,
+        finished_at=finished_at,
+        duration=(finished_at - started_at).total_seconds(),
+        records=records_synced(job_data),
+        bytes=bytes_synced(job_data),
+        status=status,
+    )
+
+
+def errored_run(connection_id: str, job_id: str, started_at: datetime) -> SyncRun:
+    """History row for a flow that failed before its job's outcome was known."""
+    finished_at = utcnow()
+    duration = (finished_at - started_at).total_seconds()
+    return SyncRun(connection_id, str(job_id), started_at, finished_at, duration, status="error")
+
+
+def ensure_history(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute(
+        f"CREATE TABLE IF NOT EXISTS {HISTORY_TABLE}("
+        "connection_id VARCHAR, job_id VARCHAR, started_at TIMESTAMP, finished_at TIMESTAMP, "
+        "duration DOUBLE, records BIGINT, bytes BIGINT, status VARCHAR, "
+        "PRIMARY KEY (connection_id, job_id))"
+    )
+
+
+@contextmanager
+def _locked_connection(db_path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    with open(f"{db_path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        con = duckdb.connect(db_path)
+        try:
+            ensure_history(con)
+            yield con
+        finally:
+            con.close()
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def record_run(db_path: str, run: SyncRun) -> None:
+    """Insert or complete the history row for ``run`` (keyed on connection + job)."""
+    with _locked_connection(db_path) as con:
+        # Upsert spelled out: duckdb 0.9 rejects INSERT OR REPLACE with a composite key
+        con.execute(
+            f"INSERT INTO {HISTORY_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (connection_id, job_id) DO UPDATE SET "
+            "started_at = excluded.started_at, finished_at = excluded.finished_at, "
+            "duration = excluded.duration, records = excluded.records, "
+            "bytes = excluded.bytes, status = excluded.status",
+            [
+                run.connection_id,
+                str(run.job_id),
+                run.started_at,
+                run.finished_at,
+                run.duration,
+                run.records,
+                run.bytes,
+                run.status,
+            ],
+        )
+
+
+def load_history(
+    db_path: str, connection_ids: Optional[Iterable[str]] = None, per_connection: int = 20
+) -> Dict[str, List[SyncRun]]:
+    """Most recent runs per connection, newest first; empty before the first recorded sync."""
+    if not os.path.exists(db_path):
+        return {}
+    with _locked_connection(db_path) as con:
+        rows = con.execute(
+            "SELECT * EXCLUDE (rn) FROM (SELECT *, row_number() OVER "
+            "(PARTITION BY connection_id ORDER BY started_at DESC) AS rn "
+            f"FROM {HISTORY_TABLE}) WHERE rn <= ? ORDER BY connection_id, started_at DESC",
+            [per_connection],
+        ).fetchall()
+    wanted = set(connection_ids) if connection_ids is not None else None
+    history: Dict[str, List[SyncRun]] = {}
+    for row in rows:
+        run = SyncRun(*row)
+        if wanted is None or run.connection_id in wanted:
+            history.setdefault(run.connection_id, []).append(run)
+    return history
@@ -0,0 +1,92 @@
+"""OpenTelemetry spans for Prefect tasks.
+
+Export is enabled by OTEL_EXPORTER_OTLP_ENDPOINT (OTLP/HTTP collector) or
+OTEL_TRACES_FILE (JSON lines); without either the tracer is a no-op.
+Decorate task functions with ``@traced()`` underneath ``@task``.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import os
+
+from opentelemetry import context as otel_context, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "udo-prefect-flows")
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+OTEL_TRACES_FILE = os.getenv("OTEL_TRACES_FILE", "")
+
+
+def _configure() -> None:
+    processors = []
+    if OTEL_EXPORTER_OTLP_ENDPOINT:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        endpoint = f"{OTEL_EXPORTER_OTLP_ENDPOINT.rstrip('/')}/v1/traces"
+        processors.append(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+    if OTEL_TRACES_FILE:
+        exporter = ConsoleSpanExporter(
+            out=open(OTEL_TRACES_FILE, "a"),
+            formatter=lambda span: json.dumps(json.loads(span.to_json())) + "\n",
+        )
+        processors.append(BatchSpanProcessor(exporter))
+    if not processors:
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+    for processor in processors:
+        provider.add_span_processor(processor)
+    trace.set_tracer_provider(provider)
+
+
+_configure()
+tracer = trace.get_tracer("udo.prefect")
+
+
+def flush() -> None:
+    """Flush buffered spans; call at the end of a flow so short-lived runs are exported."""
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "force_flush"):
+        provider.force_flush()
+
+
+def start_flow_span(name: str, **attributes):
+    """Start a root span for a flow run and make it current; pair with ``end_flow_span``."""
+    span = tracer.start_span(f"flow {name}", attributes=attributes)
+    token = otel_context.attach(trace.set_span_in_context(span))
+    return span, token
+
+
+def end_flow_span(span, token) -> None:
+    otel_context.detach(token)
+    span.end()
+    flush()
+
+
+def traced(name: str | None = None):
+    """Wrap a (sync or async) function in a span named ``task <name>``."""
+
+    def decorator(fn):
+        span_name = f"task {name or fn.__name__}"
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(span_name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
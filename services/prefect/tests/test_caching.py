@@ -0,0 +1,62 @@
+import os
+
+import duckdb
+
+from flows.caching import (
+    duckdb_input_key,
+    duckdb_task_cache_key,
+    records_synced,
+    source_fingerprints,
+)
+
+
+def test_records_synced_from_last_attempt():
+    job = {
+        "job": {"id": 1},
+        "attempts": [{"attempt": {"recordsSynced": 5}}, {"attempt": {"recordsSynced": 0}}],
+    }
+    assert records_synced(job) == 0
+    assert records_synced({"attempts": [{"attempt": {"totalStats": {"recordsCommitted": 7}}}]}) == 7
+    assert records_synced({"job": {"status": "succeeded"}}) is None
+
+
+def test_source_fingerprints_track_file_changes(tmp_path):
+    csv = tmp_path / "data.csv"
+    csv.write_text("a\n1\n")
+    sql = [f"CREATE TABLE t AS SELECT * FROM read_csv_auto('{csv}')"]
+    before = source_fingerprints(sql)
+    assert list(before) == [str(csv)]
+    csv.write_text("a\n1\n2\n")
+    assert source_fingerprints(sql) != before
+
+
+def test_no_op_syncs_share_a_key_and_real_loads_do_not(tmp_path):
+    sql = ["CREATE TABLE IF NOT EXISTS t(x INT)"]
+    db = str(tmp_path / "x.duckdb")
+    assert duckdb_input_key(db, sql, 0, "job-1") == duckdb_input_key(db, sql, 0, "job-2")
+    assert duckdb_input_key(db, sql, 10, "job-1") != duckdb_input_key(db, sql, 10, "job-2")
+    assert duckdb_input_key(db, sql, None, "job-1") != duckdb_input_key(db, sql, None, "job-2")
+    assert duckdb_input_key(db, sql, 0) != duckdb_input_key(db, sql + ["SELECT 1"], 0)
+
+
+def test_task_cache_key_accepts_script_or_statements():
+    params = {"db_path": "/tmp/a.duckdb", "records_synced": 0, "job_id": "j"}
+    by_script = duckdb_task_cache_key(None, {**params, "sql_script": "SELECT 1"})
+    by_list = duckdb_task_cache_key(None, {**params, "sql_statements": ["SELECT 1"]})
+    assert by_script == by_list
+
+
+def test_recreated_target_is_not_served_from_cache(tmp_path):
+    sql = ["CREATE TABLE IF NOT EXISTS t(x INT)"]
+    db = str(tmp_path / "x.duckdb")
+    duckdb.connect(db).close()
+    existing = duckdb_input_key(db, sql, 0, "job-1")
+    assert duckdb_input_key(db, sql, 0, "job-2") == existing
+    os.remove(db)
+    assert duckdb_input_key(db, sql, 0, "job-3") != existing
+    snapshots = tmp_path / "snapshots"
+    snapshots.mkdir()
+    empty = duckdb_input_key(str(snapshots), sql, 0)
+    (snapshots / "snapshot-1.duckdb").write_bytes(b"")
+    (snapshots / "CURRENT").write_text("snapshot-1.duckdb")
+    assert duckdb_input_key(str(snapshots), sql, 0) != empty
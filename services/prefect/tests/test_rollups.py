@@ -0,0 +1,100 @@
+import duckdb
+
+from flows.rollups import refresh_rollups
+
+
+def load(con, rows):
+    placeholders = ", ".join(["(?, ?, ?, ?, ?)"] * len(rows))
+    con.execute(f"INSERT INTO products VALUES {placeholders}", [v for row in rows for v in row])
+
+
+def make_db():
+    con = duckdb.connect()
+    con.execute(
+        "CREATE TABLE products(product_id INT, roi DOUBLE, revenue DOUBLE, cost DOUBLE, "
+        "loaded_at TIMESTAMP)"
+    )
+    con.execute(
+        "CREATE TABLE product_categories AS SELECT * FROM (VALUES "
+        "(1, 'retail'), (2, 'logistics')) t(product_id, category)"
+    )
+    return con
+
+
+def test_skipped_until_base_tables_exist():
+    assert refresh_rollups(duckdb.connect()) == {}
+
+
+def test_incremental_refresh_matches_full_rebuild():
+    con = make_db()
+    load(con, [(1, 0.5, 100, 50, "2025-01-01 10:00:00"), (2, 0.4, 80, 40, "2025-01-01 11:00:00")])
+    assert set(refresh_rollups(con).values()) == {"full"}
+
+    load(con, [(1, 0.7, 120, 30, "2025-01-02 09:00:00"), (3, 0.2, 10, 8, "2025-01-02 09:30:00")])
+    assert set(refresh_rollups(con).values()) == {"incremental"}
+    by_day = "SELECT * FROM rollup_roi_by_day_category ORDER BY ALL"
+    incremental = con.execute(by_day).fetchall()
+
+    con.execute("DELETE FROM rollup_catalog")
+    assert set(refresh_rollups(con).values()) == {"full"}
+    assert con.execute(by_day).fetchall() == incremental
+    by_category = dict(con.execute("SELECT category, n FROM rollup_roi_by_category").fetchall())
+    assert by_category == {"retail": 2, "logistics": 1, "unknown": 1}
+
+
+def test_rewritten_history_triggers_full_rebuild():
+    con = make_db()
+    load(con, [(1, 0.5, 100, 50, "2025-01-01 10:00:00")])
+    refresh_rollups(con)
+    con.execute("DELETE FROM products")
+    load(con, [(2, 0.4, 80, 40, "2025-01-01 09:00:00")])
+    assert set(refresh_rollups(con).values()) == {"full"}
+    assert con.execute("SELECT category FROM rollup_roi_by_category").fetchall() == [("logistics",)]
+
+
+def test_recategorised_product_triggers_full_rebuild():
+    con = make_db()
+    load(con, [(1, 0.5, 100, 50, "2025-01-01 10:00:00")])
+    refresh_rollups(con)
+    con.execute("UPDATE product_categories SET category = 'software' WHERE product_id = 1")
+    load(con, [(2, 0.4, 80, 40, "2025-01-02 10:00:00")])
+    assert set(refresh_rollups(con).values()) == {"full"}
+    by_category = "SELECT category, n, sum_revenue FROM rollup_roi_by_category ORDER BY ALL"
+    assert con.execute(by_category).fetchall() == [("logistics", 1, 80.0), ("software", 1, 100.0)]
+
+
+def test_time_rollups_skipped_without_loaded_at():
+    con = duckdb.connect()
+    con.execute(
+        "CREATE TABLE products AS SELECT 1 AS product_id, 0.5 AS roi, 10 AS revenue, 5 AS cost"
+    )
+    con.execute("CREATE TABLE product_categories AS SELECT 1 AS product_id, 'retail' AS category")
+    assert refresh_rollups(con) == {
+        "rollup_roi_by_category": "full",
+        "rollup_roi_by_day_category": "skipped",
+    }
+
+
+def test_undated_rows_and_null_roi_are_accounted_for():
+    con = make_db()
+    load(con, [(1, 0.5, 100, 50, "2025-01-01 10:00:00")])
+    refresh_rollups(con)
+    # An undated row and a NULL roi arrive after the first refresh
+    load(con, [(1, 0.9, 10, 5, None), (1, None, 10, 5, "2025-01-02 10:00:00")])
+    assert set(refresh_rollups(con).values()) == {"full"}
+    n, avg_roi = con.execute(
+        "SELECT n, sum_roi / n_roi FROM rollup_roi_by_category WHERE category = 'retail'"
+    ).fetchone()
+    assert n == 3
+    assert avg_roi == con.execute("SELECT avg(roi) FROM products").fetchone()[0]
+    days = con.execute("SELECT sum(n) FROM rollup_roi_by_day_category").fetchone()[0]
+    assert days == 2
+
+
+def test_rollups_without_current_columns_are_rebuilt():
+    con = make_db()
+    load(con, [(1, 0.5, 100, 50, "2025-01-01 10:00:00")])
+    refresh_rollups(con)
+    con.execute("ALTER TABLE rollup_roi_by_category DROP COLUMN n_roi")
+    load(con, [(2, 0.4, 80, 40, "2025-01-02 10:00:00")])
+    assert refresh_rollups(con)["rollup_roi_by_category"] == "full"
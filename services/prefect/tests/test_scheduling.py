@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+from flows.scheduling import ConnectionSchedule, plan_syncs
+from flows.sync_history import SyncRun, bytes_synced, finished_run, load_history, record_run
+
+NOW = datetime(2025, 1, 10, 12, 0)
+
+
+def run(conn, hours_ago, records=10, status="succeeded", duration=60.0, job=None):
+    started = NOW - timedelta(hours=hours_ago)
+    return SyncRun(
+        conn,
+        job or f"{conn}-{hours_ago}",
+        started,
+        started + timedelta(seconds=duration),
+        duration,
+        records,
+        1000,
+        status,
+    )
+
+
+def test_history_round_trip(tmp_path):
+    db = str(tmp_path / "history.duckdb")
+    assert load_history(db) == {}
+    record_run(db, SyncRun("a", "1", NOW - timedelta(hours=2)))
+    record_run(db, run("a", 2, job="1"))  # completes the running row
+    record_run(db, run("a", 1))
+    record_run(db, run("b", 1))
+    history = load_history(db, ["a"])
+    assert list(history) == ["a"]
+    runs = [(r.job_id, r.status) for r in history["a"]]
+    assert runs == [("a-1", "succeeded"), ("1", "succeeded")]
+    assert bytes_synced({"attempts": [{"attempt": {"bytesSynced": 42}}]}) == 42
+
+
+def test_idle_connections_are_stretched_and_reset_on_change():
+    schedules = [ConnectionSchedule("idle"), ConnectionSchedule("busy"), ConnectionSchedule("new")]
+    history = {
+        "idle": [run("idle", 1, records=0), run("idle", 2, records=0), run("idle", 3, records=5)],
+        "busy": [run("busy", 1.5, records=3), run("busy", 2.5, records=0)],
+    }
+    plan = {p.connection_id: p for p in plan_syncs(schedules, history, NOW)}
+    assert plan["idle"].interval == 4 * 3600
+    assert plan["idle"].start_at == NOW + timedelta(hours=3)
+    assert plan["busy"].interval == 3600 and plan["busy"].start_at == NOW
+    assert plan["new"].start_at == NOW and plan["new"].reason == "no history"
+
+
+def test_stretch_is_capped_and_failures_retry_at_base():
+    schedules = [ConnectionSchedule("idle", max_interval=2 * 3600), ConnectionSchedule("broken")]
+    history = {
+        "idle": [run("idle", h, records=0) for h in (1, 2, 3, 4, 5)],
+        "broken": [run("broken", 1.5, status="failed"), run("broken", 2, records=0)],
+    }
+    plan = {p.connection_id: p for p in plan_syncs(schedules, history, NOW)}
+    assert plan["idle"].interval == 2 * 3600
+    assert plan["broken"].interval == 3600 and plan["broken"].reason == "retry after failed"
+
+
+def test_long_syncs_are_staggered_and_in_flight_ones_skipped():
+    schedules = [ConnectionSchedule(c) for c in ("big1", "big2", "small", "busy")]
+    history = {
+        "big1": [run("big1", 3, duration=1800)],
+        "big2": [run("big2", 2, duration=1800)],
+        "small": [run("small", 2)],
+        "busy": [SyncRun("busy", "j", NOW - timedelta(minutes=5)), run("busy", 3)],
+    }
+    plan = {p.connection_id: p for p in plan_syncs(schedules, history, NOW)}
+    assert "busy" not in plan
+    assert plan["big1"].start_at == NOW and plan["small"].start_at == NOW
+    assert plan["big2"].start_at == NOW + timedelta(seconds=1800)
+    assert "staggered" in plan["big2"].reason
+
+
+def test_abandoned_running_rows_do_not_block():
+    history = {"c": [SyncRun("c", "stuck", NOW - timedelta(hours=5)), run("c", 6)]}
+    plan = plan_syncs([ConnectionSchedule("c")], history, NOW)
+    assert [p.start_at for p in plan] == [NOW]
+
+
+def test_finished_run_uses_airbyte_job_window():
+    started = datetime(2025, 1, 10, 11, 0, tzinfo=timezone.utc)
+    job = {
+        "job": {
+            "status": "SUCCEEDED",
+            "createdAt": started.timestamp(),
+            "updatedAt": started.timestamp() + 90,
+        },
+        "attempts": [{"attempt": {"recordsSynced": 5, "bytesSynced": 64}}],
+    }
+    row = finished_run("a", 7, NOW, job)
+    assert (row.job_id, row.status, row.duration, row.records, row.bytes) == (
+        "7",
+        "succeeded",
+        90.0,
+        5,
+        64,
+    )
+    assert row.started_at == datetime(2025, 1, 10, 11, 0)
@@ -0,0 +1,32 @@
+import duckdb
+import pytest
+
+from flows.snapshots import list_snapshots, publish_snapshot, read_current
+
+
+def test_publish_builds_on_current_and_swaps_pointer(tmp_path):
+    first = publish_snapshot(
+        str(tmp_path), lambda con: con.execute("CREATE TABLE t AS SELECT 1 AS v")
+    )
+    assert read_current(str(tmp_path)) == first
+    second = publish_snapshot(str(tmp_path), lambda con: con.execute("INSERT INTO t VALUES (2)"))
+    assert read_current(str(tmp_path)) == second != first
+    con = duckdb.connect(second, read_only=True)
+    assert con.execute("SELECT count(*) FROM t").fetchone() == (2,)
+    con.close()
+
+
+def test_failed_build_keeps_current_snapshot(tmp_path):
+    first = publish_snapshot(str(tmp_path), lambda con: con.execute("CREATE TABLE t(v INT)"))
+    with pytest.raises(duckdb.Error):
+        publish_snapshot(str(tmp_path), lambda con: con.execute("SELECT * FROM missing"))
+    assert read_current(str(tmp_path)) == first
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".staging-")]
+
+
+def test_old_snapshots_are_pruned(tmp_path):
+    publish_snapshot(str(tmp_path), lambda con: con.execute("CREATE TABLE t(v INT)"))
+    insert = lambda con: con.execute("INSERT INTO t VALUES (1)")  # noqa: E731
+    for _ in range(4):
+        publish_snapshot(str(tmp_path), insert, retain=2)
+    assert len(list_snapshots(str(tmp_path))) == 2